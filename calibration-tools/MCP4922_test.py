@@ -6,42 +6,31 @@
 
 Incrementally increases and decreases voltage from 0 to 600
 never ending loop on both channels
+The sweep is computed up front and played against absolute deadlines
 
 MIT License
 """
 
-import time
+import os
 import sys
-import RPi.GPIO as GPIO
 
-from MCP4922 import MCP4922
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-GPIO.setmode(GPIO.BCM)                 # use the Broadcom pin numbering
-GPIO.setwarnings(False)             # disable warnings
+from vumonitor.backends import MCP4922
+from vumonitor.waveform import Player, report, triangle
+
+# values per second, e.g. 1000 to see how fast the needle follows
+rate = 10
 
 
 if __name__ == '__main__':
     dac = MCP4922()
+    player = Player(dac, [0, 1], rate, log=sys.stdout)
+    dac.start()
     try:
-        while True:
-            x = 0
-            for i in range(0, 100):
-                x = x + 6
-                dac.setVoltage(0, x)
-                dac.setVoltage(1, x)
-                print(x)
-                time.sleep(0.1)
-            for i in range(0, 100):
-                x = x - 6
-                dac.setVoltage(0, x)
-                dac.setVoltage(1, x)
-                print(x)
-                time.sleep(0.1)
-
+        player.play(triangle(0, 600, 101), repeat=None)
     except KeyboardInterrupt:   # Press CTRL C to exit program
-        dac.setVoltage(0, 0)
-        dac.setVoltage(1, 0)
-        dac.shutdown(0)
-        dac.shutdown(1)
-        GPIO.cleanup()
-        sys.exit(0)
+        pass
+    finally:
+        dac.stop()
+        print(report(player.late))
@@ -8,6 +8,7 @@
 Software PWM
 Loop trough the min and max value
 uses limited growth function, instead of linear function
+The sweep is computed up front and played against absolute deadlines
 
 
 Requires:
@@ -19,10 +20,14 @@ MIT License
 
 from __future__ import division
 
-import RPi.GPIO as GPIO
+import os
+import sys
 
-import time
-import math
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from vumonitor.backends import RPiGPIOPWM
+from vumonitor.mapping import GrowthCurve
+from vumonitor.waveform import Player, mapped, report, triangle
 
 
 # PWM Maximum Duty Cycle
@@ -35,49 +40,29 @@ pwm_freq = 200
 vu_pin1 = 23  # BCM23 Physical 16
 vu_pin2 = 24  # BCM24 Physical 18
 
+# values per second, e.g. 1000 to see how fast the needle follows
+rate = 10
+
 # math stuff
 # Growth function constants
 B0 = 0
 k = 0.02
 
-# GPIO Setup
-GPIO.setmode(GPIO.BCM)
-
-GPIO.setup(vu_pin1, GPIO.OUT)
-GPIO.setup(vu_pin2, GPIO.OUT)
-
-p1 = GPIO.PWM(vu_pin1, pwm_freq)
-p2 = GPIO.PWM(vu_pin2, pwm_freq)
-
-# start PWM
-p1.start(0)
-p2.start(0)
-
 # Growth function, because I love math :P
+B = GrowthCurve(S, B0=B0, k=k)
 
+# up and down again
+sweep = mapped(B, triangle(0, 100, 101))
 
-def B(t):
-    return S - (S - B0) * math.exp(-k * t)
-
+backend = RPiGPIOPWM([vu_pin1, vu_pin2], pwm_freq)
+player = Player(backend, [vu_pin1, vu_pin2], rate, log=sys.stdout)
 
+backend.start()
 try:
-    while True:
-        for i in range(100):
-            pwm_float = B(i)
-            p1.ChangeDutyCycle(pwm_float)
-            p2.ChangeDutyCycle(pwm_float)
-            print("i = {}, pwm_float = {}" .format(i, pwm_float))
-            time.sleep(0.1)
-        for i in range(100, 0, -1):
-            pwm_float = B(i)
-            p1.ChangeDutyCycle(pwm_float)
-            p2.ChangeDutyCycle(pwm_float)
-            print("i = {}, pwm_float = {}" .format(i, pwm_float))
-            time.sleep(0.1)
-
+    player.play(sweep, repeat=None)
 except KeyboardInterrupt:
-    # Cleanup
-    p1.stop()
-    p2.stop()
-    GPIO.cleanup()
     pass
+finally:
+    # Cleanup
+    backend.stop()
+    print(report(player.late))
@@ -8,6 +8,7 @@
 Software PWM
 Loop trough the min and max value
 uses linear function
+The sweep is computed up front and played against absolute deadlines
 
 
 Requires:
@@ -19,10 +20,13 @@ MIT License
 
 from __future__ import division
 
-import RPi.GPIO as GPIO
+import os
+import sys
 
-import time
-import math
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from vumonitor.backends import RPiGPIOPWM
+from vumonitor.waveform import Player, report, triangle
 
 # PWM Maximum Duty Cycle
 S = 10
@@ -33,47 +37,21 @@ pwm_freq = 200
 vu_pin1 = 23  # BCM23 Physical 16
 vu_pin2 = 24  # BCM24 Physical 18
 
-# math stuff
-# Growth function constants
-B0 = 0
-
-# GPIO Setup
-GPIO.setmode(GPIO.BCM)
-
-GPIO.setup(vu_pin1, GPIO.OUT)
-GPIO.setup(vu_pin2, GPIO.OUT)
-
-p1 = GPIO.PWM(vu_pin1, pwm_freq)
-p2 = GPIO.PWM(vu_pin2, pwm_freq)
-
-# Linear function
+# values per second, e.g. 1000 to see how fast the needle follows
+rate = 10
 
+# Linear function, up and down again
+sweep = triangle(0, S, 101, integer=False)
 
-def B(t):
-    return (S / 100) * t
-
+backend = RPiGPIOPWM([vu_pin1, vu_pin2], pwm_freq)
+player = Player(backend, [vu_pin1, vu_pin2], rate, log=sys.stdout)
 
+backend.start()
 try:
-    # start PWM
-    p1.start(0)
-    p2.start(0)
-    while True:
-        for i in range(100):
-            pwm_float = B(i)
-            p1.ChangeDutyCycle(pwm_float)
-            p2.ChangeDutyCycle(pwm_float)
-            print("i = {}, pwm_float = {}" .format(i, pwm_float))
-            time.sleep(0.1)
-        for i in range(100):
-            pwm_float = B(i)
-            p1.ChangeDutyCycle(S - pwm_float)
-            p2.ChangeDutyCycle(S - pwm_float)
-            print("i = {}, pwm_float = {}" .format(i, pwm_float))
-            time.sleep(0.1)
-
+    player.play(sweep, repeat=None)
 except KeyboardInterrupt:
-    # Cleanup
-    p1.stop()
-    p2.stop()
-    GPIO.cleanup()
     pass
+finally:
+    # Cleanup
+    backend.stop()
+    print(report(player.late))
@@ -9,6 +9,7 @@ Hardware PWM
 
 Loop trough the min and max value
 uses linear function
+The sweep is computed up front and played against absolute deadlines
 
 
 Requires:
@@ -20,55 +21,37 @@ MIT License
 
 from __future__ import division
 
-import wiringpi
+import os
+import sys
 
-import time
-import math
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from vumonitor.backends import WiringPiPWM
+from vumonitor.waveform import Player, report, triangle
 
 
 # PWM Maximum Duty Cycle
 S = 200
 
-# math stuff
-# Growth function constants
-B0 = 0
-
 """ Configure your pin here """
 vu_pin1 = 18  # Physical Pin 12
 vu_pin2 = 13  # Physical Pin 33
-OUTPUT = 2
 
-wiringpi.wiringPiSetupGpio()
+# values per second, e.g. 1000 to see how fast the needle follows
+rate = 10
 
-# Linear function
-def B(t):
-    return (S / 100) * t
+# Linear function, up and down again
+sweep = triangle(0, S, 101)
 
+backend = WiringPiPWM([vu_pin1, vu_pin2])
+player = Player(backend, [vu_pin1, vu_pin2], rate, log=sys.stdout)
 
+backend.start()
 try:
-    wiringpi.pinMode(vu_pin1, OUTPUT)
-    wiringpi.pinMode(vu_pin2, OUTPUT)
-    wiringpi.pwmWrite(vu_pin1, 0)  # Setup PWM using Pin, Initial Value
-    wiringpi.pwmWrite(vu_pin2, 0)
-    while True:
-        for i in range(100):
-            pwm_float = B(i)
-            wiringpi.pwmWrite(vu_pin1, int(pwm_float))
-            wiringpi.pwmWrite(vu_pin2, int(pwm_float))
-            print("i = {}, pwm_float = {}" .format(i, pwm_float))
-            time.sleep(0.1)
-        for i in range(100, 0, -1):
-            pwm_float = B(i)
-            wiringpi.pwmWrite(vu_pin1, int(pwm_float))
-            wiringpi.pwmWrite(vu_pin2, int(pwm_float))
-            print("i = {}, pwm_float = {}" .format(i, pwm_float))
-            time.sleep(0.1)
-
+    player.play(sweep, repeat=None)
 except KeyboardInterrupt:
-    # manual cleanup
-    wiringpi.pwmWrite(vu_pin1, 0)
-    wiringpi.pwmWrite(vu_pin2, 0)
-    wiringpi.pinMode(vu_pin1, 0)
-    wiringpi.pinMode(vu_pin2, 0)
-
     pass
+finally:
+    # manual cleanup
+    backend.stop()
+    print(report(player.late))
@@ -22,27 +22,21 @@ Requires:
 
 - RPi.GPIO
 - MCP4922 Driver (https://github.com/mrwunderbar666/Python-RPi-MCP4922)
-- psutil (monitoring system)
+- psutil (monitoring system, only where /proc is not available)
+- vumonitor (this repository)
 
 MIT License
 """
 
 from __future__ import division
 
-import RPi.GPIO as GPIO
-from MCP4922 import MCP4922
-
-import atexit
-import time
-import sys
-
-# PS UTIL for monitoring the system activity
-import psutil
-
-import math
+from vumonitor import GrowthCurve, History, Meter, Monitor, default_sampler, load_profile
+from vumonitor.backends import MCP4922
+from vumonitor.replay import run
 
 # Network settings, maximum bandwidth is 15 MB/s so net_max = 15,000,000 bytes
 net_max = 15000000
+# or net_max = 'auto' to follow the traffic, up to the link speed
 
 # DAC Maximum Value, it is a 12 bit DAC, so it has 4096 steps, but we limit it to 600 only.
 dac_max = 600
@@ -58,138 +52,35 @@ B0 = 0
 k = 0.02
 S = 700  # setting the limit of the growth function a bit higher, gave me best results
 
-# GPIO Setup
-
-GPIO.setmode(GPIO.BCM)
-GPIO.setwarnings(False)
-
-dac = MCP4922()
-
-
-def net_coeffiecient(bytes_received_after, bytes_received_before, bytes_send_after, bytes_send_before):
-    """
-    Here we set the current network traffic in relation to our maximum bandwidth
-    in this example, we expect a maximum (net_max) of 15 MB/s
-    to make this part not too complicated, the receiving traffic and sending traffic is just added together
-    then divided, finally we normalize the value on a scale from 0 to 100
-    """
-    net_current = ((bytes_received_after - bytes_received_before) +
-                   (bytes_send_after - bytes_send_before))
-    x = (net_current / net_max) * 100
-    #print("Current Network usage in percent is: {}" .format(x))
-    if x > 100:
-        return 100
-    elif x < 0:
-        return 0
-    else:
-        return x
-    return x
-
-
-def B(t):
-    """
-    This function calculates the DAC Value based on limited growth, that gives us a slight curve,
-    instead of strictly linear function.
-    You can adjust k and S at the top of this file
-    """
-    return S - (S - B0) * math.exp(-k * t)
-
-
 """
-You can also make a linear function like this:
-def f(x):
-    return (dac_max / 100) * x
+Calculates the DAC Value based on the percent of network / CPU usage
+if you want to change to a linear function, change here:
+
+def percent2dac(x):
+    return int((dac_max / 100) * x)
 
 """
+percent2dac = GrowthCurve(S, dac_max, B0=B0, k=k, integer=True)
 
+# Calibration profiles from `python -m vumonitor.calibration`, e.g. 'cpu.json'
+# None uses the growth function above
+cpu_profile = None
+net_profile = None
 
-def bytes2human(n):
-    """
-    Function for debugging, taken from PSUTIL Script collection
-    >>> bytes2human(10000)
-    '9.8 K'
-    >>> bytes2human(100001221)
-    '95.4 M'
-    """
-    symbols = ('K', 'M', 'G', 'T', 'P', 'E', 'Z', 'Y')
-    prefix = {}
-    for i, s in enumerate(symbols):
-        prefix[s] = 1 << (i + 1) * 10
-    for s in reversed(symbols):
-        if n >= prefix[s]:
-            value = float(n) / prefix[s]
-            return '%.2f %s' % (value, s)
-    return '%.2f B' % (n)
-
-
-def percent2dac(n):
-    """
-    Calculates the DAC Value based on the percent of network / CPU usage
-    if you want to change to a linear function, change here
-    """
-    dac_float = B(n)
-    if dac_float > dac_max:
-        return dac_max
-    elif dac_float < 0:
-        return 0
-    else:
-        return int(dac_float)
-
-
-def poll(interval):
-    """
-    Function to poll the current network usage and CPU usage
-    Retrieve raw stats within an interval window
-    """
-    net_before = psutil.net_io_counters()
-    # psutil.cpu_percent() includes a sleep for 1 second (interval)
-    dac_cpu = psutil.cpu_percent(interval)
-    net_after = psutil.net_io_counters()
-    dac_network = net_coeffiecient(
-        net_after.bytes_recv, net_before.bytes_recv, net_after.bytes_sent, net_before.bytes_sent)
-    return dac_network, dac_cpu
+# Keep the samples in a ring file, e.g. '/var/lib/vumonitor/history.ring'
+# (a week at one sample per second takes about 17 MB), None keeps no history
+history = None
 
 
 def main():
-    """
-    Starting by defining some variables
-    main function
-    """
-    net_total = 0
-    cpu_total = 0
-    counter = 0
-    try:
-        interval = 0
-        while True:
-            net_poll, cpu_poll = poll(interval)
-            net_total += net_poll
-            cpu_total += cpu_poll
-            # Print for debug only
-            #print('Net Total: {}' .format(net_total))
-            #print("CPU Total: {}" .format(cpu_total))
-            interval = 1  # Poll every second
-            counter += 1
-            #print("Counter: {}" .format(counter))
-            time.sleep(0.01)  # reduce strain on CPU
-            # count to your desired period and then update the DAC for the VU meter
-            if counter == polling_max:
-                dac.setVoltage(net_channel, percent2dac(
-                    net_total / polling_max))  # the magic happens here!
-                dac.setVoltage(cpu_channel, percent2dac(
-                    cpu_total / polling_max))
-                counter = 0
-                net_total = 0
-                cpu_total = 0
-                # print(counter)
-                time.sleep(0.01)  # Reduce strain on CPU
-    except (KeyboardInterrupt, SystemExit):
-        """ Cleaning Up """
-        dac.setVoltage(0, 0)
-        dac.setVoltage(1, 0)
-        dac.shutdown(0)
-        dac.shutdown(1)
-        GPIO.cleanup()
-        sys.exit(0)
+    cpu_curve = load_profile(cpu_profile) if cpu_profile else percent2dac
+    net_curve = load_profile(net_profile) if net_profile else percent2dac
+    dac = MCP4922()
+    monitor = Monitor(default_sampler(net_max), polling_max,
+                      history=History(history) if history else None)
+    monitor.add_meter(Meter('net', dac, net_channel, net_curve))
+    monitor.add_meter(Meter('cpu', dac, cpu_channel, cpu_curve))
+    run(monitor)
 
 
 if __name__ == '__main__':
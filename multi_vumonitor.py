@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+"""
+== Using Audio VU Meters to Monitor System Activity on Raspberry Pi ==
+
+==== Mixed Rack: PWM and DAC Meters from one Process ====
+
+In this version one process drives all VU Meters at once, no matter if they
+are attached to PWM pins or to a DAC. The system is only polled once per
+cycle and the result is fanned out to every meter, instead of running one
+script (and one psutil poll) per meter.
+It runs as an asyncio daemon: sampling and every meter are separate tasks on
+one event loop, the hardware is written from one worker thread.
+
+Just comment out the hardware you do not have.
+
+Requires:
+
+- RPi.GPIO
+- MCP4922 Driver (https://github.com/mrwunderbar666/Python-RPi-MCP4922)
+- MCP4725 Library (https://github.com/adafruit/Adafruit_Python_MCP4725)
+- psutil (monitoring system, only where /proc is not available)
+- vumonitor (this repository)
+
+MIT License
+"""
+
+from __future__ import division
+
+from vumonitor import Daemon, GrowthCurve, History, Meter, Monitor, default_sampler
+from vumonitor.backends import MCP4725, MCP4922, RPiGPIOPWM
+from vumonitor.replay import run
+
+# Network settings, maximum bandwidth is 15 MB/s so net_max = 15,000,000 bytes
+net_max = 15000000
+# or net_max = 'auto' to follow the traffic, up to the link speed
+
+# Polling cycle, set here the amount of seconds that you want to have calculated. E.g. for 5 seconds, just enter 5
+polling_max = 1
+
+# Software PWM: maximum duty cycle of 10 @200 Hz
+percent2pwm = GrowthCurve(10, k=0.02)
+# DACs: limited to 600, the limit of the growth function a bit higher
+percent2dac = GrowthCurve(700, 600, k=0.02, integer=True)
+
+# Keep the samples in a ring file, e.g. '/var/lib/vumonitor/history.ring'
+# (a week at one sample per second takes about 17 MB), None keeps no history
+history = None
+
+
+def main():
+    monitor = Monitor(default_sampler(net_max), polling_max,
+                      history=History(history) if history else None)
+
+    pwm = RPiGPIOPWM([23, 24], frequency=200)  # BCM23 Physical 16, BCM24 Physical 18
+    monitor.add_meter(Meter('cpu', pwm, 23, percent2pwm))
+    monitor.add_meter(Meter('net', pwm, 24, percent2pwm))
+
+    mcp4922 = MCP4922()
+    monitor.add_meter(Meter('cpu', mcp4922, 0, percent2dac))
+    monitor.add_meter(Meter('net', mcp4922, 1, percent2dac))
+
+    mcp4725 = MCP4725(address=0x62)
+    monitor.add_meter(Meter('net', mcp4725, 0, percent2dac))
+
+    run(monitor, live=lambda: Daemon(monitor).run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+Tests on the harnesses: the virtual clock, the cluster receiver and the fake buses
+"""
+
+from __future__ import division
+
+import socket
+import time
+
+from vumonitor.ballistics import Ballistics
+from vumonitor.backends.i2c import FakeI2CBus
+from vumonitor.backends.mcp4725 import I2cdevMCP4725, mcp4725_decode
+from vumonitor.backends.mcp4922 import SpidevMCP4922, mcp4922_decode
+from vumonitor.backends.spi import FakeSpiDev
+from vumonitor.cluster import Receiver, pack
+from vumonitor.history import History
+from vumonitor.monitor import Meter, Monitor
+from vumonitor.scheduler import AdaptiveScheduler
+from vumonitor.simulation import Simulation, VirtualClock
+from vumonitor.slew import Slew
+
+
+def identity(percent):
+    return percent
+
+
+def test_simulation_averages_every_polling_cycle():
+    sim = Simulation(lambda t: (20 if int(t) % 2 else 60, 3e6, 0), polling_max=1)
+    sim.monitor.add_meter(Meter('cpu', sim.backend, 0, identity))
+    sim.monitor.add_meter(Meter('net', sim.backend, 1, identity))
+    sim.run(3600)
+    assert sim.clock() == 3600
+    times, values = sim.backend.trace(0)
+    assert len(times) == 3600
+    assert list(times[:3]) == [1, 2, 3]
+    assert list(values[:4]) == [20, 60, 20, 60]
+    assert set(sim.backend.trace(1)[1]) == {20}  # 3 MB/s of 15 MB/s
+
+
+def test_adaptive_wake_up_neither_jumps_nor_overshoots():
+    sim = Simulation(lambda t: (10 if t < 30 else 60, 0, 0), polling_max=1, frame_rate=60)
+    scheduler = AdaptiveScheduler(1 / 60, idle_period=1, clock=sim.clock, sleep=sim.clock.sleep)
+    sim.monitor = Monitor(sim.sampler, 1, scheduler, 60)
+    sim.monitor.add_meter(Meter('cpu', sim.backend, 0, lambda p: int(p * 10), slew=Slew(1200)))
+    sim.monitor.add_meter(Meter('cpu', sim.backend, 1, identity, ballistics=Ballistics()))
+    sim.run(29)
+    assert scheduler.idle
+    sim.run(11)  # wakes up at 30 s
+    times, values = sim.backend.trace(0)
+    assert max(b - a for a, b in zip(values, values[1:])) <= 20  # 1200 / 60 per frame
+    assert values[-1] == 600
+    times, values = sim.backend.trace(1)
+    assert 60 < max(values) < 61  # 1.5 % of the 50 % step
+    assert abs(values[-1] - 60) < 0.01
+
+
+def drain(receiver, packets):
+    """ Drain until `packets` arrived, the loopback may take a moment """
+    deadline = time.monotonic() + 2
+    count = 0
+    while count < packets and time.monotonic() < deadline:
+        count += receiver.drain()
+    return count
+
+
+def test_receiver_drains_expires_and_aggregates():
+    clock = VirtualClock(100.0)
+    receiver = Receiver(port=0, bind='127.0.0.1', expire=3.0, clock=clock)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        address = receiver.address
+        sock.sendto(pack(1, 0, {'cpu': 10, 'net': 40}), address)
+        sock.sendto(pack(1, 3, {'cpu': 30, 'net': 50}), address)  # 1 and 2 lost
+        sock.sendto(pack(2, 0, {'cpu': 50, 'net': 80}), address)
+        sock.sendto(b'not a packet', address)
+        assert drain(receiver, 4) == 4
+        assert sorted(receiver.nodes) == [1, 2]
+        assert receiver.invalid == 1
+        assert receiver.lost == 2
+
+        metrics = receiver.aggregate()
+        assert metrics['cluster:cpu:max'] == 50
+        assert metrics['cluster:cpu:mean'] == 40
+        assert metrics['cluster:cpu:sum'] == 80
+        assert metrics['cluster:net:sum'] == 100  # clamped
+
+        clock.sleep(2)
+        sock.sendto(pack(2, 1, {'cpu': 20}), address)
+        assert drain(receiver, 1) == 1
+        clock.sleep(2)  # node 1 was silent for 4 s
+        metrics = receiver.aggregate()
+        assert sorted(receiver.nodes) == [2]
+        assert metrics['cluster:cpu:max'] == 20
+        assert metrics['cluster:cpu:mean'] == 20
+    finally:
+        sock.close()
+        receiver.close()
+
+
+def test_mcp4922_sends_both_channels_in_one_transfer():
+    sim = Simulation(lambda t: (20 + t % 7, 1e6 * (1 + t % 5), 0), polling_max=1)
+    spi = FakeSpiDev(clock=sim.clock)
+    dac = SpidevMCP4922(spi=spi)
+    sim.monitor.add_meter(Meter('cpu', dac, 0, lambda p: p * 40.95))
+    sim.monitor.add_meter(Meter('net', dac, 1, lambda p: p * 40.95))
+    sim.run(20)
+    start, frames, stop = spi.transfers[0], spi.transfers[1:-1], spi.transfers[-1]
+    assert len(frames) == 20
+    for t, words in [start] + frames + [stop]:
+        assert [mcp4922_decode(word)[0] for word in words] == [0, 1]
+    assert [mcp4922_decode(word)[2] for word in stop[1]] == [False, False]
+
+
+def test_mcp4922_clamps_the_value():
+    spi = FakeSpiDev()
+    dac = SpidevMCP4922(spi=spi)
+    dac.start()
+    dac.write(0, 4096)
+    dac.write(1, -5)
+    dac.flush()
+    assert [mcp4922_decode(word)[1] for word in spi.transfers[-1][1]] == [0xFFF, 0]
+    dac.stop()
+
+
+def test_mcp4725_fast_writes_two_bytes_per_chip():
+    sim = Simulation(lambda t: (20 + t % 7, 1e6 * (1 + t % 5), 0), polling_max=1)
+    bus = FakeI2CBus(clock=sim.clock)
+    sim.monitor.add_meter(Meter('cpu', I2cdevMCP4725(0x62, bus=bus), 0, lambda p: p * 40.95))
+    sim.monitor.add_meter(Meter('net', I2cdevMCP4725(0x63, bus=bus), 0, lambda p: p * 40.95))
+    sim.run(10)
+    assert bus.users == 0
+    for address in (0x62, 0x63):
+        writes = bus.device(address)
+        assert len(writes) == 12  # start, one per sample, stop
+        assert all(len(data) == 2 and data[0] & 0xF0 == 0 for t, data in writes)
+        assert mcp4725_decode(writes[0][1]) == mcp4725_decode(writes[-1][1]) == 0
+
+
+def test_mcp4725_clamps_the_value():
+    bus = FakeI2CBus()
+    dac = I2cdevMCP4725(bus=bus)
+    dac.start()
+    for value in (4096, 5000, -1):
+        dac.write(0, value)
+        dac.flush()
+    assert [mcp4725_decode(data) for t, data in bus.device(0x62)[1:]] == [0xFFF, 0xFFF, 0]
+    dac.stop()
+
+
+def test_history_keeps_every_record_of_the_ring(tmp_path):
+    path = str(tmp_path / 'history.ring')
+    history = History(path, fields=('cpu',), capacity=5)
+    for i in range(12):
+        history.append({'cpu': i}, now=1000 + i)
+    history.close()
+    with open(path, 'rb') as f:
+        f.seek(4096 + 12 % 5 * 12)  # the header takes 4096 bytes whatever the page size
+        assert f.read(4) == (1007).to_bytes(4, 'little')
+    history = History(path, readonly=True)
+    assert len(history) == 5
+    assert [record[1] for record in history.records()] == [7, 8, 9, 10, 11]
+    assert [record[0] for record in history.records(last=2)] == [1010, 1011]
+    history.close()
@@ -0,0 +1,50 @@
+"""
+== Using Audio VU Meters to Monitor System Activity on Raspberry Pi ==
+
+==== Shared vumonitor core ====
+
+One sampling engine that polls the system once and fans the result out to
+every configured VU Meter, no matter which hardware drives it.
+
+A meter is described by the metric it shows ('cpu' or 'net'), the output
+backend and channel it is attached to, and the curve that maps percent to
+the value the backend understands (duty cycle or DAC value).
+
+Backends live in vumonitor.backends and only import their hardware library
+when they are started. On Linux the system is read straight from /proc, psutil
+is only needed as a fallback on other systems.
+
+MIT License
+"""
+
+from vumonitor.autorange import AutoRange, P2Quantile, link_speed
+from vumonitor.ballistics import Ballistics
+from vumonitor.burst import BurstSampler
+from vumonitor.daemon import Daemon
+from vumonitor.calibration import load_profile
+from vumonitor.exporter import Exporter
+from vumonitor.history import History
+from vumonitor.mapping import GrowthCurve, LookupCurve, PiecewiseCurve, bytes2human, net_coefficient
+from vumonitor.monitor import Meter, Monitor
+from vumonitor.profiler import Profiler
+from vumonitor.sampler import ProcSampler, PsutilSampler, default_sampler
+from vumonitor.scheduler import AdaptiveScheduler, DeadlineScheduler
+from vumonitor.slew import Slew
+from vumonitor.stats import Histogram, Stats
+
+__all__ = [
+    'AutoRange', 'P2Quantile', 'link_speed',
+    'Ballistics',
+    'BurstSampler',
+    'Daemon',
+    'load_profile',
+    'Exporter',
+    'History',
+    'GrowthCurve', 'LookupCurve', 'PiecewiseCurve', 'bytes2human', 'net_coefficient',
+    'Meter', 'Monitor',
+    'Profiler',
+    'ProcSampler', 'PsutilSampler', 'default_sampler',
+    'AdaptiveScheduler', 'DeadlineScheduler',
+    'Slew',
+    'Histogram', 'Stats',
+]
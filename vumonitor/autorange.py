@@ -0,0 +1,167 @@
+"""
+Auto-ranging for the network meters
+
+A fixed net_max pins the needle at 100 on a gigabit link and hardly moves it
+on a slow one. AutoRange follows the traffic instead: a P2 estimator tracks a
+high percentile of the throughput in constant memory (five markers, no sample
+buffer), the range jumps up to it at once and decays towards it slowly when
+the traffic calms down. The link speed from /sys/class/net/*/speed caps it.
+
+Set net_max = 'auto' in the scripts, or pass an AutoRange as net_max to a sampler.
+"""
+
+from __future__ import division
+
+import bisect
+import os
+
+# 1 Mbit/s in bytes per second
+MBIT = 125000
+
+
+class P2Quantile(object):
+    """
+    Streaming estimate of the p-quantile (P2 algorithm, Jain & Chlamtac 1985).
+
+    Five markers hold the minimum, the p/2, p and (1 + p)/2 quantiles and the
+    maximum. Every value moves the markers by at most one position, so add()
+    costs a handful of comparisons and one parabola.
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.reset()
+
+    def reset(self):
+        p = self.p
+        self.count = 0
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        self.count += 1
+        q = self.heights
+        if self.count <= 5:
+            bisect.insort(q, x)
+            return
+        n = self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(q, x, 1, 4) - 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        desired = self.desired
+        for i in range(5):
+            desired[i] += self.increments[i]
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    # the parabola overshoots a neighbour, fall back to linear
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    @property
+    def value(self):
+        q = self.heights
+        if not q:
+            return 0
+        if self.count < 5:
+            return q[int(round(self.p * (len(q) - 1)))]
+        return q[2]
+
+
+def link_speed(interfaces=None, sysfs='/sys/class/net'):
+    """
+    Sum of the link speeds in bytes per second, None if no interface reports one.
+    `interfaces` limits it to some interfaces, None takes all but loopback.
+    Virtual interfaces (and links that are down) have no speed and are skipped.
+    """
+    try:
+        names = interfaces if interfaces is not None else os.listdir(sysfs)
+    except OSError:
+        return None
+    total = 0
+    for name in names:
+        if interfaces is None and name == 'lo':
+            continue
+        try:
+            with open(os.path.join(sysfs, name, 'speed')) as f:
+                speed = int(f.read())
+        except (IOError, OSError, ValueError):
+            continue
+        if speed > 0:
+            total += speed * MBIT
+    return total or None
+
+
+class AutoRange(object):
+    """
+    net_max that follows the traffic (bytes per second).
+
+    The range is the `quantile` of the throughput times `headroom`, so most of
+    the time the needle stays below full scale. It rises at once and falls with
+    a half-life of `decay` seconds. The estimator starts over every `window`
+    values, so old traffic is forgotten; the decay hides the restart.
+    `floor` keeps an idle line from filling the scale, `ceiling` defaults to
+    the link speed, counted twice because the meters add up both directions.
+    """
+
+    def __init__(self, quantile=0.95, decay=60, window=3000, headroom=1.25,
+                 floor=MBIT, ceiling=None, interfaces=None):
+        self.estimator = P2Quantile(quantile)
+        self.decay = decay
+        self.window = window
+        self.headroom = headroom
+        self.floor = floor
+        if ceiling is None:
+            speed = link_speed(interfaces)
+            ceiling = 2 * speed if speed else None
+        self.ceiling = ceiling
+        self.value = floor
+        self.time = None
+
+    def __float__(self):
+        return float(self.value)
+
+    def update(self, throughput, now):
+        """ Feed the throughput (bytes per second) at time `now`, returns the new range """
+        estimator = self.estimator
+        if estimator.count >= self.window:
+            estimator.reset()
+        estimator.add(throughput)
+        if self.time is not None and now > self.time:
+            self.value *= 0.5 ** ((now - self.time) / self.decay)
+        self.time = now
+        # wait for all five markers before trusting the estimate
+        if estimator.count >= 5:
+            target = estimator.value * self.headroom
+            if target > self.value:
+                self.value = target
+        if self.value < self.floor:
+            self.value = self.floor
+        if self.ceiling is not None and self.value > self.ceiling:
+            self.value = self.ceiling
+        return self.value
+
+
+def net_range(net_max, interfaces=None):
+    """ An AutoRange for net_max = 'auto', any other net_max as it is """
+    if net_max == 'auto':
+        return AutoRange(interfaces=interfaces)
+    return net_max
+
+
+__all__ = ['AutoRange', 'P2Quantile', 'link_speed', 'net_range']
@@ -0,0 +1,37 @@
+"""
+Output backends drive the actual VU Meters.
+
+A backend owns one piece of hardware (a set of PWM pins, one DAC chip) and
+has one or more channels. The hardware library is only imported in start(),
+so configuring a backend never touches the hardware.
+
+- RPiGPIOPWM: software PWM with the RPi.GPIO library
+- SoftPWM: software PWM from a dedicated real-time edge thread
+- WiringPiPWM: hardware PWM with the wiringpi library
+- MCP4922: dual channel SPI DAC with the MCP4922 Driver
+- SpidevMCP4922: the same DAC on /dev/spidev, both channels in one transfer
+- MCP4725: single channel I2C DAC with the Adafruit library
+- I2cdevMCP4725: the same DAC on /dev/i2c with fast writes and a shared bus handle
+
+WriteCache wraps any backend and skips writes that would not change the output.
+The Fake* classes simulate the hardware for tests and benchmarks.
+BusScheduler batches the writes of many SPI / I2C chips per bus and frame.
+"""
+
+from vumonitor.backends.base import Backend
+from vumonitor.backends.bus import BusScheduler
+from vumonitor.backends.cache import WriteCache
+from vumonitor.backends.fake import FakeGPIO, FakeWiringPi
+from vumonitor.backends.i2c import FakeI2CBus, I2CBus, shared_bus
+from vumonitor.backends.mcp4725 import I2cdevMCP4725, MCP4725
+from vumonitor.backends.mcp4922 import MCP4922, SpidevMCP4922
+from vumonitor.backends.rpigpio import RPiGPIOPWM
+from vumonitor.backends.softpwm import SoftPWM
+from vumonitor.backends.spi import FakeSpiDev, SpiDev
+from vumonitor.backends.wiringpi_pwm import WiringPiPWM
+
+__all__ = [
+    'Backend', 'BusScheduler', 'FakeGPIO', 'FakeI2CBus', 'FakeSpiDev', 'FakeWiringPi',
+    'I2CBus', 'I2cdevMCP4725', 'MCP4725', 'MCP4922', 'RPiGPIOPWM', 'SoftPWM', 'SpiDev',
+    'SpidevMCP4922', 'WiringPiPWM', 'WriteCache', 'shared_bus',
+]
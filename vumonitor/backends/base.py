@@ -0,0 +1,26 @@
+"""
+Base class for output backends
+"""
+
+
+class Backend(object):
+    """
+    A backend owns one piece of hardware and has one or more channels
+    """
+
+    def start(self):
+        """ Setup the hardware and move all needles to zero """
+        pass
+
+    def write(self, channel, value):
+        """ Set channel to value (duty cycle or DAC value) """
+        raise NotImplementedError
+
+    def flush(self):
+        """ Send the pending writes, for backends that collect them """
+        pass
+
+    def stop(self):
+        """ Move all needles to zero and release the hardware """
+        pass
+
@@ -0,0 +1,108 @@
+"""
+Bus scheduler for many DAC chips
+
+With a wall of meters there are several MCP4922s on SPI chip selects and several
+MCP4725s on I2C addresses. The BusScheduler owns the buses: once per frame it
+collects the pending writes of every chip, batches what the bus allows (all
+MCP4725s on one I2C bus in a single I2C_RDWR) and sends the rest chip by chip.
+
+If a frame runs out of time, the remaining chips keep their pending values for
+the next frame and are served first then, so no chip starves.
+Per bus it reports the utilization (time spent on the bus / wall time) and the
+frames that did not finish before their deadline.
+"""
+
+from __future__ import division
+
+import time
+
+
+class BusStats(object):
+
+    def __init__(self):
+        self.frames = 0
+        self.messages = 0
+        self.busy = 0.0
+        self.deferred = 0
+        self.misses = 0
+
+
+class Bus(object):
+    """ The chips on one bus and their statistics """
+
+    def __init__(self, key):
+        self.key = key
+        self.chips = []
+        self.next = 0  # first chip to serve in the next frame
+        self.stats = BusStats()
+
+
+class BusScheduler(object):
+    """
+    Sends the pending writes of all chips, grouped by bus, once per frame.
+    Chips are SpidevMCP4922 and I2cdevMCP4725 backends (anything with bus_key,
+    batched, pending_messages() and send())
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.buses = {}
+        self.started = None
+
+    def add(self, chip):
+        bus = self.buses.get(chip.bus_key)
+        if bus is None:
+            bus = self.buses[chip.bus_key] = Bus(chip.bus_key)
+        if chip not in bus.chips:
+            bus.chips.append(chip)
+            chip.scheduler = self
+        return chip
+
+    def flush(self, deadline=None):
+        """ Send the writes of one frame, deadline is when the next frame starts """
+        if self.started is None:
+            self.started = self.clock()
+        for bus in self.buses.values():
+            start = self.clock()
+            if bus.chips[0].batched:
+                self._flush_batched(bus)
+            else:
+                self._flush_sequential(bus, deadline)
+            end = self.clock()
+            bus.stats.frames += 1
+            bus.stats.busy += end - start
+            if deadline is not None and end > deadline:
+                bus.stats.misses += 1
+
+    def _flush_batched(self, bus):
+        messages = []
+        for chip in bus.chips:
+            messages.extend(chip.pending_messages())
+        if messages:
+            bus.chips[0].bus.transfer(messages)
+            bus.stats.messages += len(messages)
+
+    def _flush_sequential(self, bus, deadline):
+        count = len(bus.chips)
+        for i in range(count):
+            if deadline is not None and i > 0 and self.clock() > deadline:
+                # out of time, the rest goes first in the next frame
+                bus.stats.deferred += count - i
+                bus.next = (bus.next + i) % count
+                return
+            chip = bus.chips[(bus.next + i) % count]
+            messages = chip.pending_messages()
+            if messages:
+                chip.send(messages)
+                bus.stats.messages += len(messages)
+        bus.next = 0
+
+    def utilization(self):
+        """ {bus key: fraction of the wall time spent on that bus} """
+        elapsed = self.clock() - self.started if self.started is not None else 0
+        return dict((key, bus.stats.busy / elapsed if elapsed > 0 else 0.0)
+                    for key, bus in self.buses.items())
+
+    def misses(self):
+        """ {bus key: frames that finished after their deadline} """
+        return dict((key, bus.stats.misses) for key, bus in self.buses.items())
@@ -0,0 +1,53 @@
+"""
+Write coalescing for output backends
+
+Most frames do not change the value of a meter, especially at high frame rates.
+WriteCache remembers the last value written per channel and skips writes that
+would not change anything, which saves SPI / I2C / PWM bus time.
+"""
+
+from vumonitor.backends.base import Backend
+
+
+class WriteCache(Backend):
+    """
+    Wraps a backend, counts the writes issued and the writes skipped.
+    With a `clock`, the time spent in the backend is added up in `elapsed`
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.last = {}
+        self.writes = 0
+        self.skipped = 0
+        self.clock = None
+        self.elapsed = 0.0
+
+    def start(self):
+        self.last = {}
+        self.backend.start()
+
+    def write(self, channel, value):
+        if channel in self.last and self.last[channel] == value:
+            self.skipped += 1
+            return
+        if self.clock is None:
+            self.backend.write(channel, value)
+        else:
+            start = self.clock()
+            self.backend.write(channel, value)
+            self.elapsed += self.clock() - start
+        self.last[channel] = value
+        self.writes += 1
+
+    def flush(self):
+        if self.clock is None:
+            self.backend.flush()
+        else:
+            start = self.clock()
+            self.backend.flush()
+            self.elapsed += self.clock() - start
+
+    def stop(self):
+        self.backend.stop()
+        self.last = {}
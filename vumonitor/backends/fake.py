@@ -0,0 +1,132 @@
+"""
+Simulated hardware
+
+Stand-ins for the RPi.GPIO and wiringpi modules that record every call with a
+timestamp instead of touching pins. Together with FakeSpiDev and FakeI2CBus they
+let every backend run on a normal Linux box, for tests and vumonitor.bench:
+
+    RPiGPIOPWM(pins, gpio=FakeGPIO())
+    WiringPiPWM(pins, wiringpi=FakeWiringPi())
+    SpidevMCP4922(spi=FakeSpiDev(), ldac=25, gpio=FakeGPIO())
+    I2cdevMCP4725(0x62, bus=FakeI2CBus())
+
+All of them have timestamps(), the times at which a pin, the chip select or an
+address was written.
+"""
+
+import time
+
+from vumonitor.backends.i2c import FakeI2CBus
+from vumonitor.backends.spi import FakeSpiDev
+
+
+class FakePWM(object):
+    """ GPIO.PWM of FakeGPIO """
+
+    def __init__(self, gpio, pin, frequency):
+        self.gpio = gpio
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = None
+
+    def start(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        self.gpio.record(self.pin, 'start', duty_cycle)
+
+    def ChangeDutyCycle(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        self.gpio.record(self.pin, 'duty', duty_cycle)
+
+    def ChangeFrequency(self, frequency):
+        self.frequency = frequency
+        self.gpio.record(self.pin, 'frequency', frequency)
+
+    def stop(self):
+        self.duty_cycle = None
+        self.gpio.record(self.pin, 'stop', None)
+
+
+class FakeGPIO(object):
+    """
+    Stand-in for the RPi.GPIO module, records (timestamp, pin, event, value)
+    """
+
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.mode = None
+        self.pins = {}
+        self.events = []
+
+    def record(self, pin, event, value):
+        self.events.append((self.clock(), pin, event, value))
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, direction, initial=None):
+        self.pins[pin] = initial if initial is not None else self.LOW
+        self.record(pin, 'setup', direction)
+
+    def output(self, pin, value):
+        if pin not in self.pins:
+            raise RuntimeError('The GPIO channel has not been set up as an OUTPUT')
+        self.pins[pin] = value
+        self.record(pin, 'output', value)
+
+    def PWM(self, pin, frequency):
+        return FakePWM(self, pin, frequency)
+
+    def cleanup(self, pins=None):
+        if pins is None:
+            pins = list(self.pins)
+        elif not isinstance(pins, (list, tuple)):
+            pins = [pins]
+        for pin in pins:
+            self.pins.pop(pin, None)
+            self.record(pin, 'cleanup', None)
+
+    def timestamps(self, pin):
+        """ When the pin changed its output or duty cycle """
+        return [t for t, p, event, value in self.events
+                if p == pin and event in ('output', 'duty')]
+
+
+class FakeWiringPi(object):
+    """
+    Stand-in for the wiringpi module, records (timestamp, pin, event, value)
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.modes = {}
+        self.values = {}
+        self.events = []
+
+    def wiringPiSetupGpio(self):
+        return 0
+
+    def pinMode(self, pin, mode):
+        self.modes[pin] = mode
+        self.events.append((self.clock(), pin, 'mode', mode))
+
+    def pwmWrite(self, pin, value):
+        if not isinstance(value, int):
+            raise TypeError('pwmWrite needs an integer value')
+        self.values[pin] = value
+        self.events.append((self.clock(), pin, 'pwm', value))
+
+    def timestamps(self, pin):
+        return [t for t, p, event, value in self.events if p == pin and event == 'pwm']
+
+
+__all__ = ['FakeGPIO', 'FakeI2CBus', 'FakePWM', 'FakeSpiDev', 'FakeWiringPi']
@@ -0,0 +1,112 @@
+"""
+Linux i2c-dev interface without extra libraries
+
+One I2CBus per /dev/i2c-N is shared by every chip on that bus (see shared_bus()),
+so several MCP4725s at different addresses use the same open file handle.
+FakeI2CBus records the writes instead, for tests and benchmarks.
+"""
+
+import ctypes
+import fcntl
+import os
+import time
+
+I2C_SLAVE = 0x0703
+I2C_RDWR = 0x0707
+
+
+class i2c_msg(ctypes.Structure):
+    _fields_ = [('addr', ctypes.c_uint16), ('flags', ctypes.c_uint16),
+                ('len', ctypes.c_uint16), ('buf', ctypes.c_char_p)]
+
+
+class i2c_rdwr_ioctl_data(ctypes.Structure):
+    _fields_ = [('msgs', ctypes.POINTER(i2c_msg)), ('nmsgs', ctypes.c_uint32)]
+
+
+class I2CBus(object):
+    """
+    /dev/i2c-N, opened by the first user and closed by the last one
+    """
+
+    def __init__(self, busnum=1):
+        self.busnum = busnum
+        self.fd = None
+        self.users = 0
+        self.address = None
+
+    def open(self):
+        if self.users == 0:
+            self.fd = os.open('/dev/i2c-{}'.format(self.busnum), os.O_RDWR)
+            self.address = None
+        self.users += 1
+
+    def write(self, address, data):
+        if address != self.address:
+            fcntl.ioctl(self.fd, I2C_SLAVE, address)
+            self.address = address
+        os.write(self.fd, data)
+
+    def transfer(self, messages):
+        """
+        Write [(address, data), ...] to several chips in one I2C_RDWR ioctl
+        """
+        msgs = (i2c_msg * len(messages))()
+        for msg, (address, data) in zip(msgs, messages):
+            msg.addr = address
+            msg.flags = 0
+            msg.len = len(data)
+            msg.buf = data
+        ioctl_data = i2c_rdwr_ioctl_data(msgs, len(messages))
+        fcntl.ioctl(self.fd, I2C_RDWR, ioctl_data)
+
+    def close(self):
+        self.users -= 1
+        if self.users == 0 and self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+_buses = {}
+
+
+def shared_bus(busnum=1):
+    """ The one I2CBus for /dev/i2c-busnum in this process """
+    if busnum not in _buses:
+        _buses[busnum] = I2CBus(busnum)
+    return _buses[busnum]
+
+
+class FakeI2CBus(object):
+    """
+    Stand-in for I2CBus, records every write as (timestamp, address, data)
+    """
+
+    def __init__(self, busnum=1, clock=time.monotonic):
+        self.busnum = busnum
+        self.clock = clock
+        self.users = 0
+        self.writes = []
+
+    def open(self):
+        self.users += 1
+
+    def write(self, address, data):
+        if self.users == 0:
+            raise IOError('i2c-{} is not open'.format(self.busnum))
+        self.writes.append((self.clock(), address, bytes(data)))
+
+    def transfer(self, messages):
+        for address, data in messages:
+            self.write(address, data)
+
+    def close(self):
+        self.users -= 1
+
+    def device(self, address):
+        """ Everything written to one address, as (timestamp, data) """
+        return [(t, data) for t, a, data in self.writes if a == address]
+
+    def timestamps(self, address):
+        """ When the chip at address was written """
+        return [t for t, a, data in self.writes if a == address]
@@ -0,0 +1,107 @@
+"""
+==== Single Channel Digital to Analog Converter with Adafruit Library ====
+
+MCP4725: 1 Channel, 12 bit, I2C. Very clean, no jitter and highly accurate.
+MCP4725 uses the MCP4725 Library (https://github.com/adafruit/Adafruit_Python_MCP4725),
+I2cdevMCP4725 talks to /dev/i2c directly with the 2 byte fast write command.
+"""
+
+from vumonitor.backends.base import Backend
+from vumonitor.backends.i2c import shared_bus
+
+
+class MCP4725(Backend):
+    """
+    Only one channel (0), values are DAC values (integer).
+    Use one backend per chip to drive several VU Meters.
+    """
+
+    def __init__(self, address=0x62, busnum=None):
+        self.address = address
+        self.busnum = busnum
+        self.dac = None
+
+    def start(self):
+        import Adafruit_MCP4725
+        self.dac = Adafruit_MCP4725.MCP4725(address=self.address, busnum=self.busnum)
+        self.dac.set_voltage(0)
+
+    def write(self, channel, value):
+        self.dac.set_voltage(int(value))
+
+    def stop(self):
+        if self.dac is None:
+            return
+        # Cleaning Up
+        self.dac.set_voltage(0)
+        self.dac = None
+
+
+def mcp4725_fast_word(value):
+    """ Fast write command: 0 0 PD1 PD0 D11 D10 D9 D8, D7 ... D0 (PD = 00, normal mode) """
+    value = min(max(int(value), 0), 0xFFF)  # clamp, masking would wrap 4096 to 0
+    return bytes(bytearray((value >> 8, value & 0xFF)))
+
+
+def mcp4725_decode(data):
+    """ DAC value of a fast write command, e.g. recorded by FakeI2CBus """
+    data = bytearray(data)
+    return ((data[0] & 0x0F) << 8) | data[1]
+
+
+class I2cdevMCP4725(Backend):
+    """
+    MCP4725 on the Linux i2c-dev interface, without the Adafruit library.
+
+    Uses the fast write command (2 bytes instead of 3) and shares one open
+    /dev/i2c-N handle with every other MCP4725 on the same bus, so several
+    single channel meters (e.g. addresses 0x62 and 0x63) can run at high frame rates.
+    Pass a FakeI2CBus as `bus` for tests.
+    When the chip is added to a BusScheduler, the scheduler sends the pending write instead.
+    """
+
+    batched = True  # writes to several chips on one bus can go out in one I2C_RDWR
+    scheduler = None
+
+    def __init__(self, address=0x62, busnum=1, bus=None):
+        self.address = address
+        self.bus = bus if bus is not None else shared_bus(busnum)
+        self.pending = None
+        self.running = False
+
+    def start(self):
+        self.bus.open()
+        self.running = True
+        self.bus.write(self.address, mcp4725_fast_word(0))
+
+    @property
+    def bus_key(self):
+        return ('i2c', self.bus.busnum)
+
+    def write(self, channel, value):
+        self.pending = value
+
+    def pending_messages(self):
+        """ [(address, fast write command)] of the pending write, clears it """
+        if self.pending is None:
+            return []
+        messages = [(self.address, mcp4725_fast_word(self.pending))]
+        self.pending = None
+        return messages
+
+    def send(self, messages):
+        for address, data in messages:
+            self.bus.write(address, data)
+
+    def flush(self):
+        if self.scheduler is None:
+            self.send(self.pending_messages())
+
+    def stop(self):
+        if not self.running:
+            return
+        # Cleaning Up
+        self.running = False
+        self.pending = None
+        self.bus.write(self.address, mcp4725_fast_word(0))
+        self.bus.close()
@@ -0,0 +1,148 @@
+"""
+==== Dual Channel Digital to Analog Converter with custom Library ====
+
+MCP4922: 2 Channels, 12 bit, SPI. Very clean, no jitter and highly accurate.
+MCP4922 uses the MCP4922 Driver (https://github.com/mrwunderbar666/Python-RPi-MCP4922),
+SpidevMCP4922 talks to /dev/spidev directly and updates both channels in one transfer.
+"""
+
+from vumonitor.backends.base import Backend
+from vumonitor.backends.spi import SpiDev
+
+
+class MCP4922(Backend):
+    """
+    Channels are 0 and 1, values are DAC values (integer)
+    Only the chip select pin of the driver (`cs`, if any) is cleaned up on stop(),
+    the pins of other backends in the same process keep running.
+    """
+
+    channels = (0, 1)
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs  # passed on to the driver, e.g. spibus, spidevice, cs
+        self.dac = None
+        self.GPIO = None
+        self.pins = []
+
+    def start(self):
+        import RPi.GPIO as GPIO
+        from MCP4922 import MCP4922 as Driver
+        self.GPIO = GPIO
+        GPIO.setmode(GPIO.BCM)
+        self.dac = Driver(**self.kwargs)
+        cs = self.kwargs.get('cs')
+        self.pins = [] if cs is None else [cs]
+        for channel in self.channels:
+            self.dac.setVoltage(channel, 0)
+
+    def write(self, channel, value):
+        self.dac.setVoltage(channel, int(value))
+
+    def stop(self):
+        if self.dac is None:
+            return
+        # Cleaning Up
+        for channel in self.channels:
+            self.dac.setVoltage(channel, 0)
+            self.dac.shutdown(channel)
+        self.dac = None
+        if self.pins:
+            self.GPIO.cleanup(self.pins)
+
+
+# MCP4922 command word: A/B, BUF, GA (1 = 1x gain), SHDN (1 = active), 12 bit value
+CHANNEL_B = 1 << 15
+GAIN_1X = 1 << 13
+ACTIVE = 1 << 12
+
+
+def mcp4922_word(channel, value, active=True):
+    """ The two bytes that set `channel` to `value` (clamped to 0 ... 4095) """
+    word = GAIN_1X | min(max(int(value), 0), 0xFFF)  # clamp, masking would wrap 4096 to 0
+    if channel:
+        word |= CHANNEL_B
+    if active:
+        word |= ACTIVE
+    return bytes(bytearray((word >> 8, word & 0xFF)))
+
+
+def mcp4922_decode(word):
+    """ (channel, value, active) of a command word, e.g. recorded by FakeSpiDev """
+    word = (bytearray(word)[0] << 8) | bytearray(word)[1]
+    return int(bool(word & CHANNEL_B)), word & 0xFFF, bool(word & ACTIVE)
+
+
+class SpidevMCP4922(Backend):
+    """
+    MCP4922 on the Linux spidev interface, without the external driver.
+
+    Writes are collected and flush() sends both channel words in one ioctl.
+    With an `ldac` pin, LDAC is held high during the transfer and pulsed low
+    afterwards, so both needles move on the same edge. Without it (LDAC tied
+    to ground), every channel updates at the end of its own word.
+    Pass a FakeSpiDev as `spi` (and a stand-in for RPi.GPIO as `gpio`) for tests.
+    When the chip is added to a BusScheduler, the scheduler sends the pending words instead.
+    """
+
+    channels = (0, 1)
+    batched = False  # every chip select needs its own ioctl
+    scheduler = None
+
+    def __init__(self, bus=0, device=0, speed_hz=1000000, ldac=None, spi=None, gpio=None):
+        self.spi = spi if spi is not None else SpiDev(bus, device, speed_hz)
+        self.ldac = ldac
+        self.GPIO = gpio
+        self.pending = {}
+        self.running = False
+
+    def start(self):
+        self.spi.open()
+        self.running = True
+        if self.ldac is not None:
+            if self.GPIO is None:
+                import RPi.GPIO as GPIO
+                self.GPIO = GPIO
+            self.GPIO.setmode(self.GPIO.BCM)
+            self.GPIO.setup(self.ldac, self.GPIO.OUT, initial=self.GPIO.HIGH)
+        for channel in self.channels:
+            self.write(channel, 0)
+        self.send(self.pending_messages())
+
+    @property
+    def bus_key(self):
+        return ('spi', self.spi.bus)
+
+    def write(self, channel, value):
+        self.pending[channel] = value
+
+    def pending_messages(self):
+        """ The command words of all pending writes, clears them """
+        words = [mcp4922_word(channel, value) for channel, value in sorted(self.pending.items())]
+        self.pending.clear()
+        return words
+
+    def send(self, words):
+        if not words:
+            return
+        self.spi.transfer(words)
+        if self.ldac is not None:
+            self.GPIO.output(self.ldac, self.GPIO.LOW)
+            self.GPIO.output(self.ldac, self.GPIO.HIGH)
+
+    def flush(self):
+        if self.scheduler is None:
+            self.send(self.pending_messages())
+
+    def stop(self):
+        if not self.running:
+            return
+        # Cleaning Up
+        self.running = False
+        self.pending.clear()
+        self.spi.transfer([mcp4922_word(channel, 0, active=False) for channel in self.channels])
+        if self.ldac is not None:
+            self.GPIO.output(self.ldac, self.GPIO.LOW)
+            self.GPIO.output(self.ldac, self.GPIO.HIGH)
+            self.GPIO.cleanup(self.ldac)
+        self.spi.close()
@@ -0,0 +1,47 @@
+"""
+==== Pulse Width Modulation and standard RPi.GPIO Library ====
+
+Software PWM. Simple and straightforward, but creates a lot of jitter and the
+resolution is quite low: my VU Meters already are at maximum level with a
+PWM Duty Cycle of 10 @200 Hz.
+"""
+
+from vumonitor.backends.base import Backend
+
+
+class RPiGPIOPWM(Backend):
+    """
+    Channels are the BCM pin numbers, values are duty cycles (float)
+    Pass a FakeGPIO as `gpio` for tests.
+    """
+
+    def __init__(self, pins, frequency=200, gpio=None):
+        self.pins = list(pins)
+        self.frequency = frequency  # 200 Hz frequency seems like a good value here
+        self.pwm = {}
+        self.GPIO = gpio
+        self.running = False
+
+    def start(self):
+        if self.GPIO is None:
+            import RPi.GPIO
+            self.GPIO = RPi.GPIO
+        GPIO = self.GPIO
+        self.running = True
+        GPIO.setmode(GPIO.BCM)
+        for pin in self.pins:
+            GPIO.setup(pin, GPIO.OUT)
+            self.pwm[pin] = GPIO.PWM(pin, self.frequency)
+            self.pwm[pin].start(0)
+
+    def write(self, channel, value):
+        self.pwm[channel].ChangeDutyCycle(value)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        for p in self.pwm.values():
+            p.stop()
+        self.pwm = {}
+        self.GPIO.cleanup(self.pins)
@@ -0,0 +1,130 @@
+"""
+==== Real-time Software PWM ====
+
+RPi.GPIO's software PWM jitters and the needle jumps occasionally, because the
+edges are timed by a thread that competes with everything else. SoftPWM runs its
+own edge thread instead:
+
+- it can ask for SCHED_FIFO real-time priority (needs root or CAP_SYS_NICE)
+- it can pin itself to one core, e.g. an otherwise idle one
+- every edge sleeps until shortly before its deadline and spins the rest
+
+The error between the scheduled and the actual edge time is recorded in a
+histogram (edge_error), so the timing quality is measurable. With a FakeGPIO
+as `gpio` it runs on any Linux box, FakeGPIO records the edge timestamps.
+"""
+
+from __future__ import division
+
+import os
+import threading
+import time
+
+from vumonitor.backends.base import Backend
+from vumonitor.scheduler import sleep_until
+from vumonitor.stats import Histogram
+
+
+class SoftPWM(Backend):
+    """
+    Channels are the BCM pin numbers, values are duty cycles in percent (0 ... 100,
+    like RPi.GPIO ChangeDutyCycle). All pins share one frequency and rise together.
+
+    priority: SCHED_FIFO priority (1 ... 99) or None to stay a normal thread,
+    cpu: core to pin the thread to or None,
+    spin: how long before an edge the thread stops sleeping and spins (seconds)
+    """
+
+    def __init__(self, pins, frequency=200, gpio=None, priority=None, cpu=None, spin=0.0002,
+                 clock=time.monotonic):
+        self.pins = list(pins)
+        self.frequency = frequency
+        self.GPIO = gpio
+        self.priority = priority
+        self.cpu = cpu
+        self.spin = spin
+        self.clock = clock
+        self.duty = dict((pin, 0) for pin in self.pins)
+        self.state = {}
+        self.thread = None
+        self.running = False
+        self.realtime = False
+        self.pinned = False
+        self.edges = 0
+        self.overruns = 0
+        self.edge_error = Histogram()
+
+    def start(self):
+        if self.GPIO is None:
+            import RPi.GPIO
+            self.GPIO = RPi.GPIO
+        GPIO = self.GPIO
+        GPIO.setmode(GPIO.BCM)
+        for pin in self.pins:
+            GPIO.setup(pin, GPIO.OUT, initial=GPIO.LOW)
+            self.state[pin] = GPIO.LOW
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='vumonitor-softpwm')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def write(self, channel, value):
+        # the set of keys never changes, so the edge thread can read it any time
+        self.duty[channel] = value
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.thread.join()
+        for pin in self.pins:
+            self.GPIO.output(pin, self.GPIO.LOW)
+        self.GPIO.cleanup(self.pins)
+
+    def setup_thread(self):
+        """ Real-time priority and core pinning, for the calling thread. Failing is not fatal """
+        if self.priority is not None:
+            try:
+                os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.priority))
+                self.realtime = True
+            except (AttributeError, OSError):
+                self.realtime = False
+        if self.cpu is not None:
+            try:
+                os.sched_setaffinity(0, [self.cpu])
+                self.pinned = True
+            except (AttributeError, OSError):
+                self.pinned = False
+
+    def edge(self, pin, level, deadline):
+        now = sleep_until(deadline, self.clock, self.spin)
+        self.GPIO.output(pin, level)
+        self.state[pin] = level
+        self.edge_error.record(now - deadline)
+        self.edges += 1
+
+    def run(self):
+        self.setup_thread()
+        GPIO = self.GPIO
+        period = 1 / self.frequency
+        t = self.clock() + period
+        while self.running:
+            sleep_until(t, self.clock, self.spin)
+            falls = []
+            for pin, duty in list(self.duty.items()):
+                if duty <= 0:
+                    if self.state[pin] != GPIO.LOW:
+                        self.edge(pin, GPIO.LOW, t)
+                    continue
+                if self.state[pin] != GPIO.HIGH:
+                    self.edge(pin, GPIO.HIGH, t)
+                if duty < 100:
+                    falls.append((t + duty / 100 * period, pin))
+            for deadline, pin in sorted(falls):
+                self.edge(pin, GPIO.LOW, deadline)
+            t += period
+            now = self.clock()
+            if now > t:
+                # overran a whole period, start again on the next one
+                self.overruns += 1
+                t += ((now - t) // period + 1) * period
@@ -0,0 +1,101 @@
+"""
+Linux spidev interface without extra libraries
+
+SpiDev talks to /dev/spidevB.D with ioctl() directly, so several words (each with
+its own chip select frame) go out in one SPI_IOC_MESSAGE, that is one kernel call.
+FakeSpiDev records the transfers instead, for tests and benchmarks.
+"""
+
+import ctypes
+import fcntl
+import os
+import struct
+import time
+
+SPI_IOC_MAGIC = ord('k')
+_IOC_WRITE = 1
+
+# struct spi_ioc_transfer: tx_buf, rx_buf, len, speed_hz, delay_usecs, bits_per_word,
+# cs_change, tx_nbits, rx_nbits, word_delay_usecs, pad
+SPI_IOC_TRANSFER = struct.Struct('=QQIIHBBBBBB')
+
+
+def _iow(number, size):
+    return (_IOC_WRITE << 30) | (size << 16) | (SPI_IOC_MAGIC << 8) | number
+
+
+SPI_IOC_WR_MODE = _iow(1, 1)
+SPI_IOC_WR_BITS_PER_WORD = _iow(3, 1)
+SPI_IOC_WR_MAX_SPEED_HZ = _iow(4, 4)
+
+
+def SPI_IOC_MESSAGE(n):
+    return _iow(0, n * SPI_IOC_TRANSFER.size)
+
+
+class SpiDev(object):
+    """
+    One SPI chip select, e.g. bus 0 device 0 is /dev/spidev0.0 (CE0)
+    """
+
+    def __init__(self, bus=0, device=0, speed_hz=1000000, mode=0):
+        self.bus = bus
+        self.device = device
+        self.speed_hz = speed_hz
+        self.mode = mode
+        self.fd = None
+
+    def open(self):
+        self.fd = os.open('/dev/spidev{}.{}'.format(self.bus, self.device), os.O_RDWR)
+        fcntl.ioctl(self.fd, SPI_IOC_WR_MODE, struct.pack('=B', self.mode))
+        fcntl.ioctl(self.fd, SPI_IOC_WR_BITS_PER_WORD, struct.pack('=B', 8))
+        fcntl.ioctl(self.fd, SPI_IOC_WR_MAX_SPEED_HZ, struct.pack('=I', self.speed_hz))
+
+    def transfer(self, words):
+        """
+        Send every word (bytes) in its own chip select frame, all in one ioctl
+        """
+        data = ctypes.create_string_buffer(b''.join(words))
+        address = ctypes.addressof(data)
+        message = bytearray()
+        for i, word in enumerate(words):
+            cs_change = 1 if i < len(words) - 1 else 0
+            message += SPI_IOC_TRANSFER.pack(address, 0, len(word), self.speed_hz, 0, 8,
+                                             cs_change, 0, 0, 0, 0)
+            address += len(word)
+        fcntl.ioctl(self.fd, SPI_IOC_MESSAGE(len(words)), message)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class FakeSpiDev(object):
+    """
+    Stand-in for SpiDev, records every transfer as (timestamp, [words])
+    """
+
+    def __init__(self, bus=0, device=0, speed_hz=1000000, mode=0, clock=time.monotonic):
+        self.bus = bus
+        self.device = device
+        self.speed_hz = speed_hz
+        self.mode = mode
+        self.clock = clock
+        self.is_open = False
+        self.transfers = []
+
+    def open(self):
+        self.is_open = True
+
+    def transfer(self, words):
+        if not self.is_open:
+            raise IOError('spidev{}.{} is not open'.format(self.bus, self.device))
+        self.transfers.append((self.clock(), list(words)))
+
+    def close(self):
+        self.is_open = False
+
+    def timestamps(self):
+        """ When something went out on this chip select """
+        return [t for t, words in self.transfers]
@@ -0,0 +1,48 @@
+"""
+==== Pulse Width Modulation and WiringPi GPIO Library ====
+
+Hardware PWM. Only little jitter and about 200 steps of duty cycle until the
+VU Meter is at its peak. Only specific pins support hardware PWM, e.g.
+BCM18 (Physical 12) and BCM13 (Physical 33).
+"""
+
+from vumonitor.backends.base import Backend
+
+PWM_OUTPUT = 2  # output mode 2 is hardware PWM
+INPUT = 0
+
+
+class WiringPiPWM(Backend):
+    """
+    Channels are the BCM pin numbers, values are duty cycles (integer)
+    Pass a FakeWiringPi as `wiringpi` for tests.
+    """
+
+    def __init__(self, pins, wiringpi=None):
+        self.pins = list(pins)
+        self.wiringpi = wiringpi
+        self.running = False
+
+    def start(self):
+        if self.wiringpi is None:
+            import wiringpi
+            self.wiringpi = wiringpi
+        wiringpi = self.wiringpi
+        self.running = True
+        wiringpi.wiringPiSetupGpio()
+        for pin in self.pins:
+            wiringpi.pinMode(pin, PWM_OUTPUT)
+            wiringpi.pwmWrite(pin, 0)  # Setup PWM using Pin, Initial Value
+
+    def write(self, channel, value):
+        # make sure the value is an integer for wiringpi PWM
+        self.wiringpi.pwmWrite(channel, int(value))
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        # manual cleanup
+        for pin in self.pins:
+            self.wiringpi.pwmWrite(pin, 0)
+            self.wiringpi.pinMode(pin, INPUT)
@@ -0,0 +1,134 @@
+"""
+Standard VU Meter ballistics
+
+A real VU Meter reaches 99 % of a step in 300 ms and overshoots by about 1 - 1.5 %.
+That is a second order low pass, here discretized with the bilinear transform into a
+biquad, so filtering one frame costs a handful of multiplications.
+
+Ballistics.step() filters one value per frame (for the running monitor),
+Ballistics.filter() a whole recorded trace at once with NumPy (for offline work).
+"""
+
+from __future__ import division
+
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAX_STEP = 0.02  # seconds, longer frames are filtered in equal steps of at most this
+
+
+def damping_ratio(overshoot):
+    """
+    Damping ratio of a second order system with the given overshoot (0.015 = 1.5 %)
+    """
+    if overshoot <= 0:
+        return 1.0
+    x = math.log(overshoot)
+    return -x / math.sqrt(math.pi ** 2 + x ** 2)
+
+
+def step_response(zeta, tau):
+    """
+    Step response of a second order system at normalized time tau = natural frequency * t
+    """
+    if zeta >= 1:
+        return 1 - math.exp(-tau) * (1 + tau)
+    root = math.sqrt(1 - zeta ** 2)
+    return 1 - math.exp(-zeta * tau) * (math.cos(root * tau) + zeta / root * math.sin(root * tau))
+
+
+class Ballistics(object):
+    """
+    Second order VU Meter ballistics for one meter.
+
+    rise_time is the time to reach `settle` (99 %) of a step, overshoot the relative
+    overshoot. The defaults follow the standard VU Meter: 300 ms and 1.5 %.
+    Input and output are percent, so the filter sits between the sampler and the curve.
+    """
+
+    def __init__(self, rise_time=0.3, overshoot=0.015, settle=0.99):
+        self.rise_time = rise_time
+        self.overshoot = overshoot
+        self.zeta = damping_ratio(overshoot)
+        # first time the step response reaches `settle`, in natural frequency units
+        tau = 0.0
+        while step_response(self.zeta, tau) < settle:
+            tau += 0.001
+        self.omega = tau / rise_time
+        self.dt = None
+        self.state_dt = None  # spacing of the samples in x1, x2, y1, y2
+        self.reset()
+
+    def reset(self, value=0.0):
+        """ Needle at rest at value """
+        self.x1 = self.x2 = self.y1 = self.y2 = value
+
+    def design(self, dt):
+        """ Biquad coefficients for the frame period dt """
+        k = 2 / dt
+        w2 = self.omega ** 2
+        a0 = k * k + 2 * self.zeta * self.omega * k + w2
+        self.b0 = w2 / a0
+        self.b1 = 2 * w2 / a0
+        self.b2 = w2 / a0
+        self.a1 = (2 * w2 - 2 * k * k) / a0
+        self.a2 = (k * k - 2 * self.zeta * self.omega * k + w2) / a0
+        self.dt = dt
+
+    def step(self, x, dt):
+        """
+        Filter one frame of dt seconds. A frame longer than MAX_STEP runs as several
+        equal steps, and when the step changes the state is resampled to the new step,
+        so a change of the frame rate (e.g. an adaptive scheduler waking up) does not
+        kick the needle
+        """
+        n = max(1, int(math.ceil(dt / MAX_STEP)))
+        dt /= n
+        if dt != self.state_dt:
+            if self.state_dt is not None:
+                ratio = dt / self.state_dt
+                self.x2 = self.x1 - (self.x1 - self.x2) * ratio
+                self.y2 = self.y1 - (self.y1 - self.y2) * ratio
+            self.state_dt = dt
+        if dt != self.dt:
+            self.design(dt)
+        for _ in range(n):
+            y = (self.b0 * x + self.b1 * self.x1 + self.b2 * self.x2 -
+                 self.a1 * self.y1 - self.a2 * self.y2)
+            self.x2, self.x1 = self.x1, x
+            self.y2, self.y1 = self.y1, y
+        return y
+
+    def impulse_response(self, dt, tolerance=1e-9):
+        """
+        The filter as FIR taps, until the response has died away
+        """
+        if dt != self.dt:
+            self.design(dt)
+        x1 = x2 = y1 = y2 = 0.0
+        taps = []
+        minimum = int(self.rise_time / dt) + 3
+        x = 1.0
+        while True:
+            y = self.b0 * x + self.b1 * x1 + self.b2 * x2 - self.a1 * y1 - self.a2 * y2
+            x2, x1, x = x1, x, 0.0
+            y2, y1 = y1, y
+            taps.append(y)
+            if len(taps) > minimum and abs(y) < tolerance and abs(y2) < tolerance:
+                return taps
+
+    def filter(self, samples, dt, initial=0.0):
+        """
+        Filter a whole trace sampled every dt seconds, starting with the needle at rest
+        at `initial`. Vectorized as a convolution with the impulse response, needs NumPy.
+        Does not touch the state used by step()
+        """
+        if numpy is None:
+            raise RuntimeError('numpy is required to filter whole traces')
+        samples = numpy.asarray(samples, dtype=float) - initial
+        taps = numpy.array(self.impulse_response(dt))
+        return numpy.convolve(samples, taps)[:len(samples)] + initial
@@ -0,0 +1,220 @@
+"""
+Loop latency and jitter benchmark on simulated hardware
+
+Runs the full sample -> map -> write pipeline with every backend on its Fake
+hardware (see vumonitor.backends.fake), so performance regressions show up on a
+normal Linux box before deploying to a Pi:
+
+    python -m vumonitor.bench
+    python -m vumonitor.bench --frames 20000 --rate 100 --duration 5 mcp4922
+
+Two meters per backend: one shows the real CPU usage, the other a test signal that
+toggles between 0 and 100 every frame, so every frame really writes to the hardware.
+
+- throughput: frames as fast as possible, reports updates/sec and the cost per frame
+  of sampling (snapshot + rates), mapping (meters, curves) and writing (backend calls)
+- jitter: frames paced at --rate by the DeadlineScheduler, reports percentiles of how
+  far the intervals between the hardware writes of the test meter are off the period
+"""
+
+from __future__ import division
+
+import argparse
+import collections
+import sys
+import time
+
+from vumonitor.backends import (Backend, FakeGPIO, FakeI2CBus, FakeSpiDev, FakeWiringPi,
+                                I2cdevMCP4725, RPiGPIOPWM, SpidevMCP4922, WiringPiPWM)
+from vumonitor.mapping import GrowthCurve
+from vumonitor.monitor import Meter, Monitor
+from vumonitor.sampler import default_sampler
+from vumonitor.scheduler import DeadlineScheduler
+
+Rig = collections.namedtuple('Rig', ['meters', 'curve', 'timestamps'])
+"""
+meters: [(source, backend, channel)], timestamps(): when the test meter was written
+"""
+
+
+def rpigpio_rig(clock):
+    gpio = FakeGPIO(clock)
+    pwm = RPiGPIOPWM([23, 24], gpio=gpio)
+    return Rig([('cpu', pwm, 23), ('test', pwm, 24)], GrowthCurve(10),
+               lambda: gpio.timestamps(24))
+
+
+def wiringpi_rig(clock):
+    wiringpi = FakeWiringPi(clock)
+    pwm = WiringPiPWM([18, 13], wiringpi=wiringpi)
+    return Rig([('cpu', pwm, 18), ('test', pwm, 13)], GrowthCurve(200, integer=True),
+               lambda: wiringpi.timestamps(13))
+
+
+def mcp4922_rig(clock):
+    spi = FakeSpiDev(clock=clock)
+    dac = SpidevMCP4922(spi=spi)
+    return Rig([('cpu', dac, 0), ('test', dac, 1)], GrowthCurve(700, 600, integer=True),
+               spi.timestamps)
+
+
+def mcp4725_rig(clock):
+    bus = FakeI2CBus(clock=clock)
+    return Rig([('cpu', I2cdevMCP4725(0x62, bus=bus), 0), ('test', I2cdevMCP4725(0x63, bus=bus), 0)],
+               GrowthCurve(700, 600, integer=True), lambda: bus.timestamps(0x63))
+
+
+RIGS = collections.OrderedDict([
+    ('rpigpio', rpigpio_rig),
+    ('wiringpi', wiringpi_rig),
+    ('mcp4922', mcp4922_rig),
+    ('mcp4725', mcp4725_rig),
+])
+
+
+class TimedBackend(Backend):
+    """
+    Wraps a backend and adds up the time spent in its write() and flush()
+    """
+
+    def __init__(self, backend, clock=time.perf_counter):
+        self.backend = backend
+        self.clock = clock
+        self.elapsed = 0.0
+
+    def start(self):
+        self.backend.start()
+
+    def write(self, channel, value):
+        start = self.clock()
+        self.backend.write(channel, value)
+        self.elapsed += self.clock() - start
+
+    def flush(self):
+        start = self.clock()
+        self.backend.flush()
+        self.elapsed += self.clock() - start
+
+    def stop(self):
+        self.backend.stop()
+
+
+def percentile(values, p):
+    """ Nearest rank percentile, p in 0 ... 100 """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    rank = int(round(p / 100 * (len(values) - 1)))
+    return values[rank]
+
+
+class Pipeline(object):
+    """
+    One backend with its two meters, timed per stage
+    """
+
+    def __init__(self, name, period, clock=time.perf_counter):
+        self.name = name
+        self.clock = clock
+        self.period = period
+        rig = RIGS[name](time.monotonic)
+        self.timestamps = rig.timestamps
+        self.sampler = default_sampler()
+        self.monitor = Monitor(self.sampler, polling_max=period)
+        self.timed = {}
+        for source, backend, channel in rig.meters:
+            if backend not in self.timed:
+                self.timed[backend] = TimedBackend(backend, clock)
+            self.monitor.add_meter(Meter(source, self.timed[backend], channel, rig.curve))
+        self.frames = 0
+        self.sample = 0.0
+        self.map = 0.0
+        self.write = 0.0
+
+    def written(self):
+        return sum(timed.elapsed for timed in self.timed.values())
+
+    def frame(self, before):
+        t0 = self.clock()
+        after = self.sampler.snapshot()
+        metrics = self.sampler.rates(before, after)
+        metrics['test'] = 100 * (self.frames % 2)
+        t1 = self.clock()
+        written = self.written()
+        self.monitor.update(metrics)
+        self.monitor.frame(self.period)
+        self.monitor.flush()
+        t2 = self.clock()
+        write = self.written() - written
+        self.sample += t1 - t0
+        self.map += (t2 - t1) - write
+        self.write += write
+        self.frames += 1
+        return after
+
+    def run(self, frames=None, duration=None, scheduler=None):
+        self.monitor.start()
+        try:
+            snapshot = self.sampler.snapshot()
+            start = self.clock()
+            if scheduler is not None:
+                scheduler.start()
+            while True:
+                if frames is not None and self.frames >= frames:
+                    break
+                if duration is not None and self.clock() - start >= duration:
+                    break
+                if scheduler is not None:
+                    scheduler.wait()
+                snapshot = self.frame(snapshot)
+            return self.clock() - start
+        finally:
+            self.monitor.stop()
+
+    def jitter(self):
+        """ |interval - period| between the writes of the test meter, in seconds """
+        stamps = self.timestamps()
+        return [abs((b - a) - self.period) for a, b in zip(stamps, stamps[1:])]
+
+
+def throughput(name, frames):
+    pipeline = Pipeline(name, 0.01)
+    elapsed = pipeline.run(frames=frames)
+    per_frame = 1e6 / pipeline.frames
+    return {'updates/s': pipeline.frames / elapsed,
+            'sample us': pipeline.sample * per_frame,
+            'map us': pipeline.map * per_frame,
+            'write us': pipeline.write * per_frame}
+
+
+def jitter(name, rate, duration):
+    pipeline = Pipeline(name, 1 / rate)
+    pipeline.run(duration=duration, scheduler=DeadlineScheduler(1 / rate))
+    deviations = pipeline.jitter()
+    return dict(('jitter p{} us'.format(p), percentile(deviations, p) * 1e6) for p in (50, 90, 99, 100))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('backends', nargs='*', metavar='backend',
+                        help='{} (default: all)'.format(', '.join(RIGS)))
+    parser.add_argument('--frames', type=int, default=5000, help='frames for the throughput run')
+    parser.add_argument('--rate', type=float, default=100, help='frame rate of the jitter run (Hz)')
+    parser.add_argument('--duration', type=float, default=2, help='seconds of the jitter run')
+    args = parser.parse_args(argv)
+    for name in args.backends:
+        if name not in RIGS:
+            parser.error('unknown backend {}'.format(name))
+
+    columns = ['updates/s', 'sample us', 'map us', 'write us',
+               'jitter p50 us', 'jitter p90 us', 'jitter p99 us', 'jitter p100 us']
+    print('{:<10}'.format('backend') + ''.join('{:>15}'.format(c) for c in columns))
+    for name in args.backends or RIGS:
+        result = throughput(name, args.frames)
+        result.update(jitter(name, args.rate, args.duration))
+        print('{:<10}'.format(name) + ''.join('{:>15.1f}'.format(result[c]) for c in columns))
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Burst capture for the network meters
+
+The rates of the sampler are the average over a whole polling cycle, a burst
+of a few hundred milliseconds hardly moves the needle. BurstSampler reads the
+network counters every frame (up to 100 Hz) and holds the peak: a new peak
+shows at once, stays for `hold` seconds and then decays. Two more metrics come
+out of it:
+
+- 'net_peak': the held peak in percent, for a dedicated meter
+- 'net_blend': the peak blended with the average 'net' of the polling cycle
+
+The fast path reads /proc/net/dev through the open handle of the Monitor's
+ProcSampler and only does integer math (bytes per frame, shifts for the decay).
+"""
+
+from __future__ import division
+
+from vumonitor.mapping import NET_MAX
+from vumonitor.sampler import ProcSampler
+
+
+class BurstSampler(object):
+    """
+    Peak detector for the network traffic, sampled once per frame.
+
+    `hold` seconds a peak stays, then it decays with a time constant of about
+    `decay` seconds (rounded to a power of two frames, so the decay is a shift).
+    `blend` is the weight of the peak in 'net_blend' in percent.
+
+    The Monitor calls attach() with its sampler, set_rate() with its frame rate,
+    sample() every frame and update() with the rates of every polling cycle.
+    By default the counters are read through the sampler (a ProcSampler) and the
+    scale is the net_max of the sampler, an AutoRange included. With `net_max`,
+    `interfaces` or a `reader` of its own, the burst sampler uses those instead.
+    """
+
+    sources = ('net_peak', 'net_blend')
+
+    def __init__(self, net_max=None, hold=0.5, decay=0.25, blend=50, interfaces=None,
+                 reader=None, proc='/proc'):
+        self.interfaces = interfaces
+        self.proc = proc
+        self.reader = reader
+        self.own_reader = False
+        self.hold = hold
+        self.decay = decay
+        self.blend = int(blend)
+        self.net_max = None if net_max == 'auto' else net_max  # 'auto': the sampler's range
+        self.average = 0
+        self.peak = 0  # bytes per frame
+        self.held = 0  # frames left to hold the peak
+        self.last = None
+        self.metrics = dict.fromkeys(self.sources, 0)
+        self.set_rate(100)
+
+    def attach(self, sampler=None):
+        """ Share the /proc handle and the net_max of `sampler`, or open a reader of its own """
+        if self.net_max is None:
+            self.net_max = getattr(sampler, 'net_max', None)
+        if self.reader is None:
+            if self.interfaces is None and hasattr(sampler, 'read_net_total'):
+                self.reader = sampler
+            else:
+                self.reader = ProcSampler(interfaces=self.interfaces, proc=self.proc)
+                self.own_reader = True
+        self.rescale()
+
+    def set_rate(self, rate):
+        """ Frames per second of sample() """
+        self.rate = rate
+        self.hold_frames = int(round(self.hold * rate))
+        frames = max(1, self.decay * rate)
+        self.shift = max(0, int(round(frames)).bit_length() - 1)
+        self.rescale()
+
+    def rescale(self):
+        """ Bytes per frame at 100 %, from the current net_max (an AutoRange moves) """
+        net_max = NET_MAX if self.net_max is None else self.net_max
+        self.full = max(1, int(float(net_max) / self.rate))
+
+    def close(self):
+        if self.own_reader:
+            self.reader.close()
+
+    def update(self, metrics):
+        """ The average of the polling cycle, the scale follows an AutoRange from here """
+        self.average = int(metrics['net'])
+        self.rescale()
+
+    def sample(self):
+        """ Read the counters once, returns the metrics (the same dict every time) """
+        total = self.reader.read_net_total()
+        last = self.last
+        self.last = total
+        delta = total - last if last is not None and total > last else 0
+        peak = self.peak
+        if delta >= peak:
+            peak = delta
+            self.held = self.hold_frames
+        elif self.held:
+            self.held -= 1
+        else:
+            peak -= (peak >> self.shift) + 1
+            if peak < delta:
+                peak = delta
+        self.peak = peak
+        percent = peak * 100 // self.full
+        if percent > 100:
+            percent = 100
+        metrics = self.metrics
+        metrics['net_peak'] = percent
+        metrics['net_blend'] = (percent * self.blend + self.average * (100 - self.blend)) // 100
+        return metrics
+
+
+__all__ = ['BurstSampler']
@@ -0,0 +1,240 @@
+"""
+== VU Meter Calibration ==
+
+Instead of sweeping values and tuning k, S and dac_max by hand: set a few output
+values, read the needle (in percent of the scale), and let NumPy fit the curve.
+
+    python -m vumonitor.calibration record mcp4922 --channel 0 --codes 0:600:50 --out cpu.csv
+    python -m vumonitor.calibration fit cpu.csv --model growth --out cpu.json
+
+Models:
+
+- growth: B(t) = S - (S - B0) * exp(-k * t), like the scripts use, least squares
+  for S and B0 over a grid of k
+- monotone: straight lines through the readings, made monotone first
+  (pool adjacent violators), for meters that do not follow the growth curve
+
+The profile (JSON) is loaded at runtime with load_profile(), which returns the
+fitted curve precomputed into a LookupCurve:
+
+    percent2dac = load_profile('cpu.json')
+
+MIT License
+"""
+
+from __future__ import division
+
+import argparse
+import csv
+import json
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from vumonitor.mapping import GrowthCurve, PiecewiseCurve
+
+
+def _require_numpy():
+    if numpy is None:
+        raise RuntimeError('numpy is required to fit calibration curves')
+
+
+def fit_growth(pairs, ks=None):
+    """
+    Fit code = S - (S - B0) * exp(-k * percent) to [(percent, code), ...].
+    For a fixed k the model is linear in S and B0, so every k of the grid
+    is one least squares solve; the best k is refined on a finer grid.
+    Returns dict(S=, B0=, k=, rms=)
+    """
+    _require_numpy()
+    percent = numpy.array([p for p, c in pairs], dtype=float)
+    code = numpy.array([c for p, c in pairs], dtype=float)
+
+    def solve(k):
+        e = numpy.exp(-k * percent)
+        # code = S * (1 - e) + B0 * e
+        A = numpy.column_stack((1 - e, e))
+        (S, B0), _, _, _ = numpy.linalg.lstsq(A, code, rcond=None)
+        rms = math.sqrt(numpy.mean((A.dot((S, B0)) - code) ** 2))
+        return rms, S, B0
+
+    if ks is None:
+        ks = numpy.logspace(-4, 0, 200)
+    best = min((solve(k) + (k,)) for k in ks)
+    # refine around the best k
+    for k in numpy.linspace(best[3] * 0.9, best[3] * 1.1, 100):
+        result = solve(k) + (k,)
+        if result < best:
+            best = result
+    rms, S, B0, k = best
+    return {'S': float(S), 'B0': float(B0), 'k': float(k), 'rms': rms}
+
+
+def monotone(values):
+    """
+    Closest non-decreasing sequence (least squares), pool adjacent violators
+    """
+    blocks = []  # [mean, count]
+    for v in values:
+        blocks.append([v, 1])
+        while len(blocks) > 1 and blocks[-2][0] > blocks[-1][0]:
+            mean, count = blocks.pop()
+            blocks[-1] = [(blocks[-1][0] * blocks[-1][1] + mean * count) / (blocks[-1][1] + count),
+                          blocks[-1][1] + count]
+    result = []
+    for mean, count in blocks:
+        result.extend([mean] * count)
+    return result
+
+
+def fit_monotone(pairs):
+    """
+    Monotone piecewise linear curve through [(percent, code), ...], readings of the
+    same percent are averaged. Returns dict(points=[[percent, code], ...], rms=)
+    """
+    _require_numpy()
+    merged = {}
+    for p, c in pairs:
+        merged.setdefault(float(p), []).append(float(c))
+    percent = sorted(merged)
+    code = monotone([numpy.mean(merged[p]) for p in percent])
+    points = [[p, c] for p, c in zip(percent, code)]
+    curve = PiecewiseCurve(points)
+    rms = math.sqrt(numpy.mean([(curve(p) - c) ** 2 for p, c in pairs]))
+    return {'points': points, 'rms': rms}
+
+
+def fit(pairs, model='growth', maximum=None, integer=True):
+    """
+    A profile (dict) for the pairs, maximum limits the output (default: highest code)
+    """
+    if model == 'growth':
+        profile = fit_growth(pairs)
+    elif model == 'monotone':
+        profile = fit_monotone(pairs)
+    else:
+        raise ValueError('unknown model {}'.format(model))
+    profile['model'] = model
+    profile['maximum'] = maximum if maximum is not None else max(c for p, c in pairs)
+    profile['integer'] = integer
+    profile['pairs'] = [[p, c] for p, c in pairs]
+    return profile
+
+
+def curve(profile):
+    """ The curve a profile describes, not precomputed """
+    if profile['model'] == 'growth':
+        return GrowthCurve(profile['S'], profile['maximum'], B0=profile['B0'], k=profile['k'],
+                           integer=profile['integer'])
+    points = [(p, min(c, profile['maximum'])) for p, c in profile['points']]
+    return PiecewiseCurve(points, integer=profile['integer'])
+
+
+def save_profile(profile, path):
+    with open(path, 'w') as f:
+        json.dump(profile, f, indent=2)
+
+
+def load_profile(path, steps=1000):
+    """ Load a profile as a LookupCurve with `steps` steps from 0 to 100 percent """
+    with open(path) as f:
+        profile = json.load(f)
+    return curve(profile).lut(steps)
+
+
+def read_pairs(path):
+    """ [(percent, code), ...] from a CSV file with the columns percent, code """
+    with open(path) as f:
+        return [(float(row['percent']), float(row['code'])) for row in csv.DictReader(f)]
+
+
+def write_pairs(pairs, path):
+    with open(path, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(['percent', 'code'])
+        writer.writerows(pairs)
+
+
+def record(backend, channel, codes, ask=input, settle=None):
+    """
+    Set every code, ask for the needle reading in percent, returns [(percent, code), ...].
+    An empty answer skips the code, CTRL + C stops and returns the pairs read so far.
+    """
+    pairs = []
+    backend.start()
+    try:
+        for code in codes:
+            backend.write(channel, code)
+            backend.flush()
+            answer = ask('Code {}: needle at percent? '.format(code)).strip()
+            if answer:
+                pairs.append((float(answer), code))
+    except (KeyboardInterrupt, EOFError):
+        print()
+    finally:
+        backend.stop()
+    return pairs
+
+
+def make_backend(name, address=0x62):
+    """ A backend on real hardware for the record command """
+    from vumonitor import backends
+    factories = {
+        'rpigpio': lambda channel: backends.RPiGPIOPWM([channel]),
+        'wiringpi': lambda channel: backends.WiringPiPWM([channel]),
+        'mcp4922': lambda channel: backends.MCP4922(),
+        'spidev-mcp4922': lambda channel: backends.SpidevMCP4922(),
+        'mcp4725': lambda channel: backends.MCP4725(address=address),
+        'i2cdev-mcp4725': lambda channel: backends.I2cdevMCP4725(address=address),
+    }
+    return factories[name]
+
+
+def parse_codes(text):
+    """ 'start:stop:step' (stop included) or '0,10,20' """
+    if ':' in text:
+        start, stop, step = (float(x) for x in text.split(':'))
+        count = int(round((stop - start) / step)) + 1
+        codes = [start + i * step for i in range(count)]
+    else:
+        codes = [float(x) for x in text.split(',')]
+    return [int(c) if c == int(c) else c for c in codes]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='VU Meter calibration')
+    commands = parser.add_subparsers(dest='command')
+    rec = commands.add_parser('record', help='set codes and type in the needle readings')
+    rec.add_argument('backend', choices=['rpigpio', 'wiringpi', 'mcp4922', 'spidev-mcp4922',
+                                         'mcp4725', 'i2cdev-mcp4725'])
+    rec.add_argument('--channel', type=int, default=0, help='pin or DAC channel')
+    rec.add_argument('--address', type=lambda x: int(x, 0), default=0x62, help='I2C address')
+    rec.add_argument('--codes', default='0:600:50', help='start:stop:step or a list, e.g. 0,5,10')
+    rec.add_argument('--out', required=True, help='CSV file for the pairs')
+    fitp = commands.add_parser('fit', help='fit a curve to recorded pairs')
+    fitp.add_argument('pairs', help='CSV file from record')
+    fitp.add_argument('--model', choices=['growth', 'monotone'], default='growth')
+    fitp.add_argument('--maximum', type=float, help='limit of the output (default: highest code)')
+    fitp.add_argument('--float', action='store_true', help='output floats (RPi.GPIO duty cycles)')
+    fitp.add_argument('--out', required=True, help='JSON profile')
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        backend = make_backend(args.backend, args.address)(args.channel)
+        print('Press CTRL + C to stop, leave empty to skip a value')
+        pairs = record(backend, args.channel, parse_codes(args.codes))
+        write_pairs(pairs, args.out)
+        print('{} pairs written to {}'.format(len(pairs), args.out))
+    elif args.command == 'fit':
+        profile = fit(read_pairs(args.pairs), args.model, args.maximum, not args.float)
+        save_profile(profile, args.out)
+        print('rms error {:.2f}, profile written to {}'.format(profile['rms'], args.out))
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Cluster mode: meters that show a whole rack
+
+Every machine runs a small agent that sends its metrics as one fixed size UDP
+packet per tick to the Pi with the meters:
+
+    python -m vumonitor.cluster agent 192.168.1.50 --rate 10
+
+The Pi runs a Receiver in its Daemon. The receiver drains its non-blocking
+socket whenever the event loop sees it readable (all queued packets at once,
+up to `batch`), keeps the newest values per node and publishes the aggregates
+every `period` seconds. Nodes that stay silent for `expire` seconds drop out.
+
+Packet (little endian, 32 bytes): magic 'VU', version, 0, node id (uint32),
+sequence number (uint32), cpu, net, cpu_max, net_rx, net_tx (float32 percent)
+
+Every field is published as max, mean and sum over the nodes, e.g.
+'cluster:cpu:max', 'cluster:net:mean', 'cluster:net_tx:sum', the source of a meter.
+"""
+
+from __future__ import division
+
+import argparse
+import errno
+import socket
+import struct
+import time
+import zlib
+
+from vumonitor.mapping import clamp_percent
+from vumonitor.sampler import default_sampler
+from vumonitor.scheduler import DeadlineScheduler
+
+MAGIC = b'VU'
+VERSION = 1
+PORT = 5151
+FIELDS = ('cpu', 'net', 'cpu_max', 'net_rx', 'net_tx')
+PACKET = struct.Struct('<2sBBII{}f'.format(len(FIELDS)))
+
+
+def node_id(name=None):
+    """ 32 bit id of a node, from its host name by default """
+    return zlib.crc32((name or socket.gethostname()).encode()) & 0xFFFFFFFF
+
+
+def pack(node, seq, metrics):
+    return PACKET.pack(MAGIC, VERSION, 0, node, seq & 0xFFFFFFFF,
+                       *[metrics.get(name, 0) for name in FIELDS])
+
+
+class Agent(object):
+    """
+    Sends the metrics of this machine to `host` every `period` seconds
+    """
+
+    def __init__(self, host, port=PORT, period=0.1, node=None, sampler=None):
+        self.address = (host, port)
+        self.node = node_id(node)
+        self.sampler = sampler or default_sampler()
+        self.scheduler = DeadlineScheduler(period)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.seq = 0
+
+    def send(self, metrics):
+        try:
+            self.sock.sendto(pack(self.node, self.seq, metrics), self.address)
+        except OSError:
+            pass  # the receiver is not up yet, keep going
+        self.seq += 1
+
+    def run(self):
+        try:
+            before = self.sampler.snapshot()
+            self.scheduler.start()
+            while True:
+                self.scheduler.wait()
+                after = self.sampler.snapshot()
+                self.send(self.sampler.rates(before, after))
+                before = after
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.sampler.close()
+            self.sock.close()
+
+
+class Receiver(object):
+    """
+    Collects the packets of the agents and aggregates them per field
+    """
+
+    def __init__(self, port=PORT, bind='0.0.0.0', expire=3.0, period=0.1, batch=1024,
+                 clock=time.monotonic):
+        self.expire = expire
+        self.period = period
+        self.batch = batch
+        self.clock = clock
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.sock.bind((bind, port))
+        self.sock.setblocking(False)
+        self.buf = bytearray(PACKET.size + 1)
+        self.nodes = {}  # node id -> (time, sequence number, values)
+        self.packets = 0
+        self.invalid = 0
+        self.lost = 0
+        self.metrics = {}
+
+    @property
+    def address(self):
+        return self.sock.getsockname()
+
+    def close(self):
+        self.sock.close()
+
+    def drain(self):
+        """ Read every queued packet (up to batch), never blocks. Returns the number read """
+        recv_into = self.sock.recv_into
+        buf = self.buf
+        nodes = self.nodes
+        now = self.clock()
+        count = 0
+        while count < self.batch:
+            try:
+                n = recv_into(buf)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            count += 1
+            if n != PACKET.size:
+                self.invalid += 1
+                continue
+            packet = PACKET.unpack_from(buf)
+            if packet[0] != MAGIC or packet[1] != VERSION:
+                self.invalid += 1
+                continue
+            node, seq = packet[3], packet[4]
+            last = nodes.get(node)
+            if last is not None and 1 < seq - last[1] < 1000:
+                self.lost += seq - last[1] - 1
+            nodes[node] = (now, seq, packet[5:])
+        self.packets += count
+        return count
+
+    def aggregate(self):
+        """ Drop the stale nodes and compute max, mean and sum of every field """
+        nodes = self.nodes
+        stale = self.clock() - self.expire
+        for node in [node for node, (t, _, _) in nodes.items() if t < stale]:
+            del nodes[node]
+        metrics = self.metrics
+        count = len(nodes)
+        for i, name in enumerate(FIELDS):
+            values = [values[i] for _, _, values in nodes.values()]
+            total = sum(values)
+            metrics['cluster:{}:max'.format(name)] = clamp_percent(max(values)) if values else 0
+            metrics['cluster:{}:mean'.format(name)] = clamp_percent(total / count) if count else 0
+            metrics['cluster:{}:sum'.format(name)] = clamp_percent(total)
+        return metrics
+
+    async def serve(self, daemon):
+        """ Daemon task: daemon.add_task(receiver.serve) """
+        loop = daemon.loop
+        loop.add_reader(self.sock.fileno(), self.drain)
+
+        try:
+            await daemon.every(self.period, lambda: daemon.publish_all(self.aggregate()))
+        finally:
+            loop.remove_reader(self.sock.fileno())
+            self.close()
+
+
+__all__ = ['Agent', 'Receiver', 'node_id', 'pack']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Send the metrics of this machine to a vumonitor')
+    subparsers = parser.add_subparsers(dest='command')
+    agent = subparsers.add_parser('agent', help='send metrics to a receiver')
+    agent.add_argument('host')
+    agent.add_argument('--port', type=int, default=PORT)
+    agent.add_argument('--rate', type=float, default=10, help='packets per second')
+    agent.add_argument('--name', default=None, help='node name, default: host name')
+    args = parser.parse_args(argv)
+    if args.command != 'agent':
+        parser.error('choose a command')
+    Agent(args.host, args.port, 1 / args.rate, args.name).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+asyncio daemon mode
+
+Instead of one blocking loop, the sampler, every meter and any extra listeners
+run as tasks on one event loop:
+
+- the sampler task takes a snapshot every polling_max seconds and updates the meters
+- the output task runs the frame of every meter (ballistics, slew) and flushes the
+  backends and buses at the frame rate, as one hardware call per frame, so the
+  channels of one chip still go out in one transfer
+- with a BurstSampler, one more task reads the network peak every frame
+- a lag probe measures how late the event loop wakes up
+- add_task() plugs in more coroutines, e.g. network listeners that publish()
+  remote metrics to the meters
+
+Everything that touches the hardware runs in a single worker thread, so the
+event loop never blocks on a bus and two writes never race on the same bus.
+The tasks wait for their hardware calls, so the worker never falls behind, and
+a hardware call that fails stops the daemon with its exception.
+"""
+
+from __future__ import division
+
+import asyncio
+import concurrent.futures
+import inspect
+
+
+def update(meters, value):
+    for meter in meters:
+        meter.update(value)
+
+
+class FrameCounter(object):
+    """
+    Frames, missed deadlines and lateness of a task run by Daemon.every(), with the
+    names of DeadlineScheduler, so the exporter reads either of them
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.ticks = 0
+        self.missed = 0
+        self.drift = 0.0
+        self.max_drift = 0.0
+
+    def tick(self, late):
+        self.ticks += 1
+        self.drift = late
+        if late > self.max_drift:
+            self.max_drift = late
+
+
+class Daemon(object):
+    """
+    Runs a configured Monitor on an asyncio event loop
+    """
+
+    def __init__(self, monitor, lag_interval=0.5):
+        self.monitor = monitor
+        self.lag_interval = lag_interval
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.metrics = {}
+        self.tasks = []
+        self.extra = []
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.loop = None
+        self.error = None
+        self.frames = FrameCounter(monitor.frame_period)  # of the output task
+
+    def add_task(self, factory):
+        """ factory(daemon) returns a coroutine that runs next to the meters """
+        self.extra.append(factory)
+
+    def publish(self, name, value):
+        """
+        Set metric `name` to value (percent) and update every meter that shows it.
+        Returns the future of the hardware call, None if no meter shows it
+        """
+        self.metrics[name] = value
+        meters = [meter for meter in self.monitor.meters if meter.source == name]
+        if meters:
+            return self.hardware(update, meters, value)
+
+    def publish_all(self, metrics):
+        """ publish() every metric of a dict, returns one awaitable for all hardware calls """
+        futures = [self.publish(name, value) for name, value in metrics.items()]
+        return asyncio.gather(*[future for future in futures if future is not None])
+
+    def hardware(self, fn, *args):
+        """ Run a blocking hardware call in the hardware thread, a failure stops the daemon """
+        future = self.loop.run_in_executor(self.executor, fn, *args)
+        future.add_done_callback(self.check)
+        return future
+
+    def check(self, future):
+        if future.cancelled() or future.exception() is None:
+            return
+        if self.error is None:
+            self.error = future.exception()
+        self.stop()
+
+    async def every(self, period, fn, counter=None):
+        """
+        Call fn() at fixed deadlines, like DeadlineScheduler, and await what it returns.
+        A FrameCounter as `counter` counts the calls, the missed deadlines and how late they were
+        """
+        deadline = self.loop.time() + period
+        while True:
+            await asyncio.sleep(deadline - self.loop.time())
+            if counter is not None:
+                counter.tick(self.loop.time() - deadline)
+            result = fn()
+            if inspect.isawaitable(result):
+                await result
+            deadline += period
+            now = self.loop.time()
+            if now >= deadline:
+                skipped = int((now - deadline) // period) + 1
+                deadline += skipped * period
+                if counter is not None:
+                    counter.missed += skipped
+
+    async def sampler(self):
+        sampler = self.monitor.sampler
+        state = {'snapshot': sampler.snapshot()}
+
+        burst = self.monitor.burst
+        history = self.monitor.history
+        exporter = self.monitor.exporter
+
+        def sample():
+            after = sampler.snapshot()
+            metrics = sampler.rates(state['snapshot'], after)
+            if burst is not None:
+                burst.update(metrics)
+            if history is not None:
+                history.append(metrics)
+            published = self.publish_all(metrics)
+            if exporter is not None:
+                exporter.render(self.monitor, self.metrics, self)
+            state['snapshot'] = after
+            return published
+
+        await self.every(self.monitor.polling_max, sample)
+
+    async def output(self):
+        monitor = self.monitor
+        dt = monitor.frame_period
+
+        def frame(deadline):
+            monitor.frame(dt)
+            monitor.flush(deadline)
+
+        await self.every(dt, lambda: self.hardware(frame, self.loop.time() + dt), self.frames)
+
+    async def burst(self):
+        burst = self.monitor.burst
+        await self.every(self.monitor.frame_period, lambda: self.publish_all(burst.sample()))
+
+    async def lag_probe(self):
+        while True:
+            expected = self.loop.time() + self.lag_interval
+            await asyncio.sleep(self.lag_interval)
+            self.lag = self.loop.time() - expected
+            if self.lag > self.max_lag:
+                self.max_lag = self.lag
+
+    def stop(self):
+        """ Stop all tasks, the meters are cleaned up before run() returns """
+        for task in self.tasks:
+            task.cancel()
+
+    async def main(self):
+        self.loop = asyncio.get_running_loop()
+        await self.hardware(self.monitor.start)
+        try:
+            self.tasks = [asyncio.ensure_future(self.sampler()),
+                          asyncio.ensure_future(self.output()),
+                          asyncio.ensure_future(self.lag_probe())]
+            if self.monitor.burst is not None:
+                self.tasks.append(asyncio.ensure_future(self.burst()))
+            self.tasks.extend(asyncio.ensure_future(factory(self)) for factory in self.extra)
+            await asyncio.gather(*self.tasks)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+            await self.hardware(self.monitor.stop)
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        try:
+            asyncio.run(self.main())
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.executor.shutdown()
@@ -0,0 +1,141 @@
+"""
+Prometheus /metrics endpoint
+
+Serves what the monitor already knows in the Prometheus text format: the
+current metrics (percent), the value last written to every meter, and the
+timing of the loop (frames, missed deadlines, lateness, writes, CPU time and,
+with Stats, the histograms as summaries). Under a Daemon the frame counters are
+those of its output task, and the Stats histograms (only the blocking loop
+fills them) are left out.
+
+The page is rendered once per sample by the monitor and kept as bytes, a
+scrape only sends those bytes from the server thread, so it never computes
+anything and never waits for the output loop:
+
+    monitor = Monitor(polling_max=1, exporter=Exporter(port=9105))
+    curl http://localhost:9105/metrics
+"""
+
+from __future__ import division
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def label(value):
+    """ A label value with backslash, quote and newline escaped """
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.server.exporter.body
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # no line on stderr per scrape
+
+
+class Exporter(object):
+    """
+    HTTP server of the /metrics page on `port`, start() runs it in a thread.
+    render() builds the page, the Monitor calls it after every sample.
+    """
+
+    def __init__(self, port=9105, bind='', clock=time.process_time):
+        self.port = port
+        self.bind = bind
+        self.clock = clock
+        self.body = b''
+        self.server = None
+
+    def start(self):
+        if self.server is not None:
+            return
+        self.server = ThreadingHTTPServer((self.bind, self.port), _Handler)
+        self.server.exporter = self
+        self.port = self.server.server_address[1]
+        thread = threading.Thread(target=self.server.serve_forever, name='vumonitor-exporter')
+        thread.daemon = True
+        thread.start()
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def render(self, monitor, metrics, daemon=None):
+        """ Build the page from the metrics of the last sample and the state of the monitor """
+        lines = []
+        add = lines.append
+
+        def header(name, kind, text):
+            add('# HELP {} {}'.format(name, text))
+            add('# TYPE {} {}'.format(name, kind))
+
+        header('vumonitor_metric', 'gauge', 'Metric of the last sample in percent')
+        for name in sorted(metrics):
+            add('vumonitor_metric{{name="{}"}} {}'.format(label(name), float(metrics[name])))
+
+        header('vumonitor_output', 'gauge', 'Value last written to a meter (duty cycle or DAC value)')
+        for meter in monitor.meters:
+            value = getattr(meter.backend, 'last', {}).get(meter.channel)
+            if value is not None:
+                add('vumonitor_output{{meter="{}",source="{}",channel="{}"}} {}'.format(
+                    label(meter.name), label(meter.source), label(meter.channel), float(value)))
+
+        writes, skipped = monitor.write_counts()
+        header('vumonitor_writes_total', 'counter', 'Writes sent to the backends')
+        add('vumonitor_writes_total {}'.format(writes))
+        header('vumonitor_writes_skipped_total', 'counter', 'Writes skipped because nothing changed')
+        add('vumonitor_writes_skipped_total {}'.format(skipped))
+
+        scheduler = monitor.scheduler if daemon is None else daemon.frames
+        header('vumonitor_frames_total', 'counter', 'Frames of the main loop')
+        add('vumonitor_frames_total {}'.format(scheduler.ticks))
+        header('vumonitor_missed_deadlines_total', 'counter', 'Frame deadlines skipped after an overrun')
+        add('vumonitor_missed_deadlines_total {}'.format(scheduler.missed))
+        header('vumonitor_frame_period_seconds', 'gauge', 'Current frame period')
+        add('vumonitor_frame_period_seconds {}'.format(scheduler.period))
+        header('vumonitor_late_seconds', 'gauge', 'How late the last frame woke up')
+        add('vumonitor_late_seconds {}'.format(scheduler.drift))
+        header('vumonitor_max_late_seconds', 'gauge', 'Latest wake up of a frame so far')
+        add('vumonitor_max_late_seconds {}'.format(scheduler.max_drift))
+
+        stats = monitor.stats
+        if stats is not None and daemon is None:
+            header('vumonitor_loop_seconds', 'summary', 'Time per frame and stage of the main loop')
+            for name in stats.names:
+                h = stats.histograms[name]
+                for q in QUANTILES:
+                    add('vumonitor_loop_seconds{{stage="{}",quantile="{}"}} {}'.format(
+                        name, q, h.percentile(q * 100)))
+                add('vumonitor_loop_seconds_sum{{stage="{}"}} {}'.format(name, h.total))
+                add('vumonitor_loop_seconds_count{{stage="{}"}} {}'.format(name, h.count))
+
+        if daemon is not None:  # the frame series above come from its output task
+            header('vumonitor_event_loop_lag_seconds', 'gauge', 'How late the event loop woke up')
+            add('vumonitor_event_loop_lag_seconds {}'.format(daemon.lag))
+            header('vumonitor_event_loop_max_lag_seconds', 'gauge', 'Largest event loop lag so far')
+            add('vumonitor_event_loop_max_lag_seconds {}'.format(daemon.max_lag))
+
+        header('process_cpu_seconds_total', 'counter', 'CPU time of the monitor process')
+        add('process_cpu_seconds_total {}'.format(self.clock()))
+        self.body = ('\n'.join(lines) + '\n').encode()
+        return self.body
+
+
+__all__ = ['Exporter']
@@ -0,0 +1,167 @@
+"""
+Metric history in a memory mapped ring file
+
+Every sample of the Monitor can be appended to a fixed size file of packed
+records, so days of history take a few MB on the SD card and memory use stays
+constant. The file is mapped into memory: appending a sample is one
+struct.pack_into() into the mapping, and the kernel writes the dirty pages back
+now and then instead of once per sample.
+
+Layout (little endian), the header takes 4096 bytes on every machine, so a ring
+written on a kernel with 16K pages (Pi 5) reads the same on one with 4K pages:
+
+    magic 'VUHIST1\\0', record size (uint32), capacity (uint32), fields (uint32),
+    records written so far (uint64), field names (comma separated, utf-8)
+
+    record: seconds (uint32), microseconds (uint32), one float32 per field
+
+Record i lives in slot i % capacity. The count is bumped after the record is
+written, so other tools can read the file while the monitor runs:
+
+    python -m vumonitor.history /var/lib/vumonitor/history.ring > history.csv
+"""
+
+from __future__ import division
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+
+# numpy is optional, only for History.array()
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b'VUHIST1\0'
+HEADER = struct.Struct('<8sIIIQ')
+COUNT_OFFSET = 20
+HEADER_SIZE = 4096  # fixed, not mmap.PAGESIZE: the layout must not depend on the writer
+FIELDS = ('cpu', 'net', 'cpu_max', 'net_rx', 'net_tx')
+CAPACITY = 7 * 24 * 3600  # a week at one sample per second
+
+
+class History(object):
+    """
+    Ring file of `capacity` records with one float32 per field.
+
+    An existing file is opened and appended to, it has to have the same fields
+    (and capacity, if given). With readonly=True the file is only read, e.g.
+    while a monitor writes to it.
+    """
+
+    def __init__(self, path, fields=FIELDS, capacity=None, clock=time.time, readonly=False):
+        self.path = path
+        self.clock = clock
+        self.readonly = readonly
+        if readonly or os.path.exists(path):
+            self.f = open(path, 'rb' if readonly else 'r+b')
+            header = self.f.read(HEADER_SIZE)
+            magic, _, stored_capacity, _, _ = HEADER.unpack_from(header)
+            if magic != MAGIC:
+                raise ValueError('{} is not a vumonitor history file'.format(path))
+            names = header[HEADER.size:].split(b'\0', 1)[0].decode()
+            stored_fields = tuple(names.split(',')) if names else ()
+            if not readonly and (stored_fields != tuple(fields) or
+                                 capacity not in (None, stored_capacity)):
+                raise ValueError('{} records {} x {}, not {} x {}'.format(
+                    path, stored_capacity, ','.join(stored_fields), capacity, ','.join(fields)))
+            self.fields = stored_fields
+            self.capacity = stored_capacity
+        else:
+            self.fields = tuple(fields)
+            self.capacity = capacity or CAPACITY
+            names = ','.join(self.fields).encode()
+            if HEADER.size + len(names) >= HEADER_SIZE:
+                raise ValueError('too many fields')
+            self.f = open(path, 'w+b')
+            record_size = struct.calcsize('<II{}f'.format(len(self.fields)))
+            self.f.write(HEADER.pack(MAGIC, record_size, self.capacity, len(self.fields), 0) + names)
+        self.record = struct.Struct('<II{}f'.format(len(self.fields)))
+        size = HEADER_SIZE + self.capacity * self.record.size
+        if not readonly:
+            self.f.truncate(size)
+        self.map = mmap.mmap(self.f.fileno(), size,
+                             access=mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE)
+        self.count = self.written
+
+    @property
+    def written(self):
+        """ Records written so far, as stored in the file """
+        return struct.unpack_from('<Q', self.map, COUNT_OFFSET)[0]
+
+    def close(self):
+        if self.map is not None:
+            if not self.readonly:
+                self.map.flush()
+            self.map.close()
+            self.map = None
+            self.f.close()
+
+    def append(self, metrics, now=None):
+        """ Store the fields of one sample (a dict of metric name -> percent) """
+        if now is None:
+            now = self.clock()
+        seconds = int(now)
+        count = self.count
+        self.record.pack_into(self.map, HEADER_SIZE + count % self.capacity * self.record.size,
+                              seconds, int((now - seconds) * 1e6),
+                              *[metrics.get(name, 0) for name in self.fields])
+        self.count = count + 1
+        struct.pack_into('<Q', self.map, COUNT_OFFSET, self.count)
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def records(self, last=None):
+        """
+        (time, value, value, ...) of the stored records, oldest first, `last` limits it to the newest ones.
+        Records that the writer overwrites while they are read are left out.
+        """
+        count = self.written
+        first = max(0, count - self.capacity)
+        if last is not None:
+            first = max(first, count - last)
+        size = self.record.size
+        for i in range(first, count):
+            record = self.record.unpack_from(self.map, HEADER_SIZE + i % self.capacity * size)
+            if i < self.written - self.capacity:
+                continue  # re-checked after the read: the writer wrapped around meanwhile
+            yield (record[0] + record[1] / 1e6,) + record[2:]
+
+    def array(self):
+        """ The stored records as a numpy structured array, oldest first """
+        if numpy is None:
+            raise RuntimeError('numpy is not installed')
+        dtype = numpy.dtype([('seconds', '<u4'), ('microseconds', '<u4')] +
+                            [(name, '<f4') for name in self.fields])
+        data = numpy.frombuffer(self.map, dtype, self.capacity, HEADER_SIZE)
+        count = self.written
+        if count <= self.capacity:
+            return data[:count].copy()
+        start = count % self.capacity
+        return numpy.concatenate((data[start:], data[:start]))
+
+
+__all__ = ['History']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Print a vumonitor history file as CSV')
+    parser.add_argument('path')
+    parser.add_argument('--last', type=int, default=None, help='only the newest records')
+    args = parser.parse_args(argv)
+    history = History(args.path, readonly=True)
+    out = sys.stdout
+    out.write('time,{}\n'.format(','.join(history.fields)))
+    for record in history.records(args.last):
+        out.write('{:.6f},{}\n'.format(record[0], ','.join('{:.6g}'.format(v) for v in record[1:])))
+    history.close()
+
+
+if __name__ == '__main__':
+    main()
+
@@ -0,0 +1,145 @@
+"""
+Mapping system statistics to VU Meter values
+
+Everything here is pure math, no hardware and no system access.
+"""
+
+from __future__ import division
+
+import math
+
+# Network settings, maximum bandwidth is 15 MB/s so net_max = 15,000,000 bytes
+NET_MAX = 15000000
+
+
+def clamp_percent(x):
+    """
+    Normalize a value on a scale from 0 to 100
+    """
+    if x > 100:
+        return 100
+    elif x < 0:
+        return 0
+    return x
+
+
+def net_coefficient(bytes_received_after, bytes_received_before, bytes_send_after, bytes_send_before,
+                    net_max=NET_MAX):
+    """
+    Here we set the current network traffic in relation to our maximum bandwidth
+    in this example, we expect a maximum (net_max) of 15 MB/s
+    to make this part not too complicated, the receiving traffic and sending traffic is just added together
+    then divided, finally we normalize the value on a scale from 0 to 100
+    """
+    net_current = ((bytes_received_after - bytes_received_before) +
+                   (bytes_send_after - bytes_send_before))
+    return clamp_percent((net_current / net_max) * 100)
+
+
+class GrowthCurve(object):
+    """
+    Calculates the PWM Duty cycle or DAC Value based on limited growth, that gives us a slight curve,
+    instead of strictly linear function.
+
+        B(t) = S - (S - B0) * exp(-k * t)
+
+    The result is limited to 0 ... maximum. For the DACs it helps to set the limit of the
+    growth function (S) a bit higher than the maximum value.
+    Set integer=True for outputs that only take whole numbers (wiringpi PWM, DACs)
+    """
+
+    def __init__(self, S, maximum=None, B0=0, k=0.02, integer=False):
+        self.S = S
+        self.maximum = S if maximum is None else maximum
+        self.B0 = B0
+        self.k = k
+        self.integer = integer
+
+    def B(self, t):
+        return self.S - (self.S - self.B0) * math.exp(-self.k * t)
+
+    def __call__(self, percent):
+        value = self.B(percent)
+        if value > self.maximum:
+            value = self.maximum
+        elif value < 0:
+            value = 0
+        if self.integer:
+            return int(value)
+        return value
+
+    def lut(self, steps=1000):
+        return LookupCurve.from_curve(self, steps)
+
+
+class PiecewiseCurve(object):
+    """
+    Straight lines between calibration points [(percent, value), ...], sorted by percent.
+    Below the first and above the last point the value stays constant.
+    """
+
+    def __init__(self, points, integer=False):
+        self.points = sorted(points)
+        self.integer = integer
+
+    def __call__(self, percent):
+        points = self.points
+        if percent <= points[0][0]:
+            value = points[0][1]
+        elif percent >= points[-1][0]:
+            value = points[-1][1]
+        else:
+            for (x0, y0), (x1, y1) in zip(points, points[1:]):
+                if percent <= x1:
+                    value = y0 + (y1 - y0) * (percent - x0) / (x1 - x0) if x1 > x0 else y1
+                    break
+        if self.integer:
+            return int(value)
+        return value
+
+    def lut(self, steps=1000):
+        return LookupCurve.from_curve(self, steps)
+
+
+class LookupCurve(object):
+    """
+    Any curve precomputed into a table indexed by percent, so the hot path is one
+    multiplication and one list lookup instead of math.exp().
+    steps is the number of steps from 0 to 100 percent (1000: 0.1 percent)
+    """
+
+    def __init__(self, table):
+        self.table = list(table)
+        self.steps = len(self.table) - 1
+        self.scale = self.steps / 100
+
+    @classmethod
+    def from_curve(cls, curve, steps=1000):
+        return cls(curve(i * 100 / steps) for i in range(steps + 1))
+
+    def __call__(self, percent):
+        i = int(percent * self.scale + 0.5)
+        if i < 0:
+            i = 0
+        elif i > self.steps:
+            i = self.steps
+        return self.table[i]
+
+
+def bytes2human(n):
+    """
+    Function for debugging, taken from PSUTIL Script collection
+    >>> bytes2human(10000)
+    '9.77 K'
+    >>> bytes2human(100001221)
+    '95.37 M'
+    """
+    symbols = ('K', 'M', 'G', 'T', 'P', 'E', 'Z', 'Y')
+    prefix = {}
+    for i, s in enumerate(symbols):
+        prefix[s] = 1 << (i + 1) * 10
+    for s in reversed(symbols):
+        if n >= prefix[s]:
+            value = float(n) / prefix[s]
+            return '%.2f %s' % (value, s)
+    return '%.2f B' % (n)
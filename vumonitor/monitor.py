@@ -0,0 +1,284 @@
+"""
+The sampling engine: poll once, update every meter.
+"""
+
+from __future__ import division
+
+from vumonitor.backends.cache import WriteCache
+from vumonitor.sampler import default_sampler
+from vumonitor.scheduler import DeadlineScheduler
+
+
+class Meter(object):
+    """
+    One VU Meter: shows the metric `source` ('cpu', 'net', ...) on `channel` of `backend`.
+    `curve` maps percent to the value the backend understands, e.g. a GrowthCurve.
+    With `ballistics` (see vumonitor.ballistics) the percent is filtered every frame
+    before it goes through the curve.
+    With a `slew` (see vumonitor.slew) the new value is only the target and the needle
+    moves toward it in frame(), otherwise the value is written at once.
+    """
+
+    def __init__(self, source, backend, channel, curve, name=None, slew=None, ballistics=None):
+        self.source = source
+        self.backend = backend
+        self.channel = channel
+        self.curve = curve
+        self.name = name or '{}:{}'.format(source, channel)
+        self.slew = slew
+        self.ballistics = ballistics
+        self.percent = 0
+
+    def update(self, percent):
+        self.percent = percent
+        if self.ballistics is None:
+            self.set(self.curve(percent))
+
+    def set(self, value):
+        if self.slew is None:
+            self.backend.write(self.channel, value)
+        else:
+            self.slew.target = value
+
+    def frame(self, dt):
+        """
+        Move the needle one frame. Returns how far (percent of full scale) the ballistics
+        and the slew still have to go, 0 once the needle is at rest
+        """
+        distance = 0
+        if self.ballistics is not None:
+            percent = self.ballistics.step(self.percent, dt)
+            distance = abs(self.percent - percent)
+            self.set(self.curve(percent))
+        if self.slew is None:
+            return distance
+        value = self.slew.step(dt)
+        if value is not None:
+            self.backend.write(self.channel, value)
+        if self.slew.value != self.slew.target:
+            span = abs(self.curve(100) - self.curve(0)) or 1
+            distance += abs(self.slew.target - self.slew.value) / span * 100
+        return distance
+
+
+class Monitor(object):
+    """
+    Samples the system once per cycle and fans the result out to every meter.
+
+    Polling cycle, set polling_max to the amount of seconds that you want to have calculated.
+    E.g. for 5 seconds, just enter 5. The rates are computed from the snapshots at the start
+    and the end of each cycle, so they are the exact average over polling_max seconds.
+
+    With a frame_rate (e.g. 60) the loop runs at that rate instead and every frame moves
+    the meters with a slew toward their newest value, the system is still only sampled
+    once per polling cycle.
+
+    Every backend is wrapped in a WriteCache when its first meter is added, so unchanged
+    values are never written twice. The caches count the writes issued and skipped.
+
+    With a BusScheduler as `buses`, every SPI / I2C chip of the meters is added to it and
+    the scheduler sends their writes, batched per bus, at the end of every frame.
+
+    With `stats` (see vumonitor.stats) the loop records its period and the time spent
+    sampling, mapping and writing.
+
+    With a BurstSampler as `burst` (see vumonitor.burst), the network counters are also
+    read every frame and the meters of 'net_peak' and 'net_blend' follow the held peak.
+
+    With an AdaptiveScheduler as `scheduler`, every frame reports how much the metrics
+    changed and how far the slews and ballistics still have to move the needles, and
+    the loop slows down while both stay below its threshold.
+    A slow frame counts as several frames toward the next sample.
+
+    With a History as `history` (see vumonitor.history), the metrics of every sample
+    are appended to its ring file.
+
+    With an Exporter as `exporter` (see vumonitor.exporter), the Prometheus page is
+    rendered after every sample and served while the monitor runs.
+    """
+
+    def __init__(self, sampler=None, polling_max=1, scheduler=None, frame_rate=None, buses=None,
+                 stats=None, burst=None, history=None, exporter=None):
+        self.sampler = sampler or default_sampler()
+        self.polling_max = polling_max
+        self.frame_rate = frame_rate
+        if frame_rate:
+            self.frame_period = 1 / frame_rate
+            self.frames_per_sample = max(1, int(round(polling_max * frame_rate)))
+        else:
+            self.frame_period = polling_max
+            self.frames_per_sample = 1
+        self.scheduler = scheduler or DeadlineScheduler(self.frame_period)
+        self.meters = []
+        self.caches = {}
+        self.buses = buses
+        self.stats = stats
+        if stats is not None:
+            stats.scheduler = self.scheduler
+        self.burst = burst
+        if burst is not None:
+            burst.attach(self.sampler)
+            burst.set_rate(1 / self.frame_period)
+        self.history = history
+        self.exporter = exporter
+        self.metrics = {}
+        self.observe = getattr(self.scheduler, 'observe', None)
+        self.change = 0
+        self.distance = 0
+
+    def add_meter(self, meter):
+        if self.buses is not None and hasattr(meter.backend, 'bus_key'):
+            self.buses.add(meter.backend)
+        if not isinstance(meter.backend, WriteCache):
+            if meter.backend not in self.caches:
+                self.caches[meter.backend] = WriteCache(meter.backend)
+            meter.backend = self.caches[meter.backend]
+        if self.stats is not None:
+            meter.backend.clock = self.stats.clock
+        self.meters.append(meter)
+        return meter
+
+    def write_counts(self):
+        """ Writes issued and writes skipped over all backends """
+        writes = skipped = 0
+        for cache in self.backends:
+            writes += cache.writes
+            skipped += cache.skipped
+        return writes, skipped
+
+    @property
+    def backends(self):
+        """ Every backend once, in the order the meters were added """
+        seen = []
+        for meter in self.meters:
+            if meter.backend not in seen:
+                seen.append(meter.backend)
+        return seen
+
+    def start(self):
+        for backend in self.backends:
+            backend.start()
+        if self.exporter is not None:
+            self.exporter.start()
+
+    def stop(self):
+        """ Good habit to clean up after yourself """
+        for backend in reversed(self.backends):
+            backend.stop()
+        self.sampler.close()
+        if self.burst is not None:
+            self.burst.close()
+        if self.history is not None:
+            self.history.close()
+        if self.exporter is not None:
+            self.exporter.close()
+
+    def flush(self, deadline=None):
+        """ Flush every backend and the buses, deadline defaults to the next frame of the scheduler """
+        for backend in self.backends:
+            backend.flush()
+        if self.buses is not None:
+            self.buses.flush(self.scheduler.deadline if deadline is None else deadline)
+
+    def update(self, metrics):
+        """ the magic happens here! """
+        self.metrics = metrics
+        if self.burst is not None:
+            self.burst.update(metrics)
+            metrics.update(self.burst.metrics)
+        if self.history is not None:
+            self.history.append(metrics)
+        if self.observe is not None:
+            self.change = max([abs(metrics[meter.source] - meter.percent) for meter in self.meters] or [0])
+        for meter in self.meters:
+            meter.update(metrics[meter.source])
+
+    def observe_frame(self):
+        """ Tell an adaptive scheduler whether anything changed in this frame """
+        self.observe(self.change, self.distance)
+        self.change = 0
+
+    def sample_burst(self):
+        """ Read the burst sampler and update the meters that show the peak """
+        metrics = self.burst.sample()
+        for meter in self.meters:
+            if meter.source in metrics:
+                if self.observe is not None:
+                    self.change = max(self.change, abs(metrics[meter.source] - meter.percent))
+                meter.update(metrics[meter.source])
+
+    def frame(self, dt):
+        distance = 0
+        for meter in self.meters:
+            moved = meter.frame(dt)
+            if moved > distance:
+                distance = moved
+        self.distance = distance
+
+    def tick(self, before):
+        """ Take a new snapshot, update every meter and return the snapshot for the next cycle """
+        after = self.sampler.snapshot()
+        self.update(self.sampler.rates(before, after))
+        return after
+
+    def timed_step(self, sample, before, dt):
+        """ One frame like in run(), recorded in the stats """
+        stats = self.stats
+        caches = self.backends
+        written = sum(cache.elapsed for cache in caches)
+        t0 = stats.clock()
+        stats.loop(t0, self.scheduler.drift)
+        metrics = None
+        if sample:
+            after = self.sampler.snapshot()
+            metrics = self.sampler.rates(before, after)
+            before = after
+        t1 = stats.clock()
+        if sample:
+            stats.record('sample', t1 - t0)
+        if metrics is not None:
+            self.update(metrics)
+        if self.burst is not None:
+            self.sample_burst()
+        self.frame(dt)
+        self.flush()
+        written = sum(cache.elapsed for cache in caches) - written
+        stats.record('map', stats.clock() - t1 - written)
+        stats.record('write', written)
+        return before
+
+    def run(self, until=None):
+        """ Run until interrupted, or until the scheduler clock reaches `until` """
+        try:
+            self.start()
+            snapshot = self.sampler.snapshot()
+            self.scheduler.start()
+            counter = 0
+            while until is None or self.scheduler.deadline <= until:
+                self.scheduler.wait()
+                period = self.scheduler.period
+                counter += 1 if period == self.frame_period else int(round(period / self.frame_period))
+                sample = counter >= self.frames_per_sample
+                if sample:
+                    counter = 0
+                    # a sample that wakes an idle scheduler starts the needles at the full rate
+                    dt = min(period, self.frame_period)
+                else:
+                    dt = period
+                if self.stats is not None:
+                    snapshot = self.timed_step(sample, snapshot, dt)
+                else:
+                    if sample:
+                        snapshot = self.tick(snapshot)
+                    if self.burst is not None:
+                        self.sample_burst()
+                    self.frame(dt)
+                    self.flush()
+                if self.observe is not None:
+                    self.observe_frame()
+                if sample and self.exporter is not None:
+                    self.exporter.render(self, self.metrics)
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            self.stop()
@@ -0,0 +1,206 @@
+"""
+On-demand profiling of a running monitor
+
+When a monitor misbehaves in the field, restarting it to attach a profiler
+means GPIO.cleanup() and needles dropping to zero. Instead, a Profiler can be
+triggered in the running process. It never touches the meters or the hardware:
+
+    kill -USR2 <pid>     # cProfile the main loop for 10 s, again to stop early
+
+or over a local unix socket:
+
+    echo 'profile 30' | socat - UNIX-CONNECT:/run/vumonitor-profile.sock
+    echo 'tracemalloc 60' | socat - UNIX-CONNECT:/run/vumonitor-profile.sock
+
+The results go to `directory`: vumonitor-<pid>-<time>.prof (load with pstats or
+snakeviz) or vumonitor-<pid>-<time>.tracemalloc, each with a .txt summary next to it.
+
+cProfile only sees the thread that enables it, so profiling always starts and
+stops in the main thread (the loop of Monitor.run() or of the Daemon), from a
+signal handler. The socket thread and the timers just send the signal.
+"""
+
+from __future__ import division
+
+import cProfile
+import os
+import pstats
+import signal
+import socket
+import threading
+import time
+import tracemalloc
+
+
+class Profiler(object):
+    """
+    cProfile runs and tracemalloc snapshots on request, written to `directory`
+    """
+
+    def __init__(self, directory='/tmp', seconds=10, top=40, signum=signal.SIGUSR2):
+        self.directory = directory
+        self.seconds = seconds
+        self.top = top
+        self.signum = signum
+        self.profile = None
+        self.path = None
+        self.pending = None  # seconds of a run requested from another thread
+        self.stops = 0  # stops requested from another thread (timer, socket)
+        self.timer = None
+        self.server = None
+        self.lock = threading.Lock()
+
+    def filename(self, suffix):
+        return os.path.join(self.directory, 'vumonitor-{}-{}{}'.format(
+            os.getpid(), time.strftime('%Y%m%d-%H%M%S'), suffix))
+
+    def install_signal(self):
+        """ Start or stop a cProfile run whenever the process gets signum """
+        signal.signal(self.signum, self._toggle)
+
+    def _toggle(self, signum, frame):
+        with self.lock:
+            stop = self.stops > 0
+            if stop:
+                self.stops -= 1
+            seconds, self.pending = self.pending, None
+        if stop:
+            self.stop()  # a requested stop never starts a run, even if the run is over
+        elif self.profile is None:
+            self.start(seconds or self.seconds)
+        elif seconds is None:
+            self.stop()
+
+    def _signal_main(self):
+        os.kill(os.getpid(), self.signum)
+
+    def _request_stop(self):
+        with self.lock:
+            self.stops += 1
+        self._signal_main()
+
+    @property
+    def running(self):
+        return self.profile is not None
+
+    def start(self, seconds=None):
+        """ Start profiling the calling thread, stops by itself after `seconds` """
+        if self.profile is not None:
+            return self.path
+        self.path = self.filename('.prof')
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        if seconds:
+            self.timer = threading.Timer(seconds, self._request_stop)
+            self.timer.daemon = True
+            self.timer.start()
+        return self.path
+
+    def stop(self):
+        """ Stop profiling and write the .prof and .txt files, returns the path of the .prof """
+        profile, self.profile = self.profile, None
+        if profile is None:
+            return None
+        profile.disable()
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        profile.dump_stats(self.path)
+        with open(self.path + '.txt', 'w') as f:
+            pstats.Stats(profile, stream=f).sort_stats('cumulative').print_stats(self.top)
+        return self.path
+
+    def request(self, seconds=None):
+        """ Start a run from any thread, it is started in the main thread """
+        if self.running:
+            return self.path
+        with self.lock:
+            self.pending = seconds or self.seconds
+        self._signal_main()
+        return None
+
+    def snapshot(self, seconds=0):
+        """
+        tracemalloc snapshot, taken right away if tracemalloc is already tracing,
+        otherwise after tracing `seconds` (blocks). Returns the path of the .tracemalloc file
+        """
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(10)
+            time.sleep(seconds)
+        snapshot = tracemalloc.take_snapshot()
+        if started:
+            tracemalloc.stop()
+        path = self.filename('.tracemalloc')
+        snapshot.dump(path)
+        with open(path + '.txt', 'w') as f:
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                f.write('{}\n'.format(stat))
+        return path
+
+    def serve(self, path):
+        """
+        Accept commands on the unix socket at path, one line per connection:
+        'profile [seconds]', 'stop' or 'tracemalloc [seconds]'.
+        Needs install_signal() for profile and stop.
+        """
+        if os.path.exists(path):
+            os.unlink(path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(4)
+        thread = threading.Thread(target=self._serve, name='vumonitor-profiler')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def command(self, line):
+        """ Run one command, returns the answer """
+        words = line.split()
+        if not words:
+            return 'commands: profile [seconds], stop, tracemalloc [seconds]'
+        try:
+            seconds = float(words[1]) if len(words) > 1 else None
+        except ValueError:
+            return 'not a number: {}'.format(words[1])
+        if words[0] == 'profile':
+            if self.running:
+                return 'already profiling into {}'.format(self.path)
+            self.request(seconds)
+            return 'profiling for {} s'.format(seconds or self.seconds)
+        if words[0] == 'stop':
+            if not self.running:
+                return 'not profiling'
+            path = self.path
+            self._request_stop()
+            return 'stopped, written to {}'.format(path)
+        if words[0] == 'tracemalloc':
+            return 'written to {}'.format(self.snapshot(seconds or self.seconds))
+        return 'unknown command: {}'.format(words[0])
+
+    def _serve(self):
+        server = self.server
+        while True:
+            try:
+                client, _ = server.accept()
+            except OSError:
+                return  # closed
+            try:
+                line = client.makefile('r').readline()
+                client.sendall((self.command(line) + '\n').encode())
+            except OSError:
+                pass
+            finally:
+                client.close()
+
+    def close(self):
+        if self.server is not None:
+            path = self.server.getsockname()
+            self.server.close()
+            self.server = None
+            if path and os.path.exists(path):
+                os.unlink(path)
+        self.stop()
+
+
+__all__ = ['Profiler']
@@ -0,0 +1,132 @@
+"""
+Replay of recorded metrics
+
+Drives the meters of a configured Monitor from a trace instead of the system:
+a history ring file (see vumonitor.history) or a CSV file with a time column
+and one column per metric, e.g. from `python -m vumonitor.history`. The values
+go through the same curves, ballistics, slews and backends as in a live run,
+so field incidents can be reproduced on the bench and the output throughput
+measured with realistic input, without real CPU or network load.
+
+Every script takes the same options:
+
+    python mcp4922_vumonitor.py --replay history.ring --speed 10
+    python mcp4922_vumonitor.py --replay incident.csv --fast
+"""
+
+from __future__ import division
+
+import argparse
+import csv
+import time
+
+from vumonitor.history import MAGIC, History
+from vumonitor.scheduler import sleep_until
+
+
+def load(path):
+    """ Field names and a list of (time, value, ...) records from a history file or a CSV file """
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+    if magic == MAGIC:
+        history = History(path, readonly=True)
+        try:
+            return history.fields, list(history.records())
+        finally:
+            history.close()
+    with open(path) as f:
+        rows = csv.reader(f)
+        header = next(rows)
+        if header[0] != 'time':
+            raise ValueError('{}: the first column has to be the time'.format(path))
+        return tuple(header[1:]), [tuple(float(x) for x in row) for row in rows if row]
+
+
+class Replay(object):
+    """
+    Plays a trace into a Monitor, `speed` times faster than recorded,
+    or as fast as possible with fast=True.
+
+    The trace runs on the frame grid of the monitor: every frame takes the records
+    up to its time, then moves the meters and flushes the backends. The monitor
+    neither records its history nor reads the burst sampler during a replay.
+    """
+
+    def __init__(self, monitor, fields, records, speed=1.0, fast=False, clock=time.monotonic):
+        missing = set(meter.source for meter in monitor.meters) - set(fields)
+        if missing:
+            raise ValueError('the trace has no {}'.format(', '.join(sorted(missing))))
+        self.monitor = monitor
+        self.fields = fields
+        self.records = records
+        self.speed = speed
+        self.fast = fast
+        self.clock = clock
+        self.frames = 0
+        self.elapsed = 0.0
+
+    def play(self):
+        monitor = self.monitor
+        records = self.records
+        if not records:
+            return
+        history, burst = monitor.history, monitor.burst
+        monitor.history = monitor.burst = None
+        period = monitor.frame_period
+        fields = self.fields
+        t0 = records[0][0]
+        end = records[-1][0]
+        i = n = 0
+        start = self.clock()
+        try:
+            monitor.start()
+            while True:
+                virtual = t0 + n * period
+                metrics = None
+                while i < len(records) and records[i][0] <= virtual:
+                    metrics = records[i]
+                    i += 1
+                if metrics is not None:
+                    monitor.update(dict(zip(fields, metrics[1:])))
+                monitor.frame(period)
+                monitor.flush()
+                n += 1
+                if virtual >= end:
+                    break
+                if not self.fast:
+                    sleep_until(start + n * period / self.speed, self.clock)
+        finally:
+            self.frames = n
+            self.elapsed = self.clock() - start
+            monitor.history, monitor.burst = history, burst
+            monitor.stop()
+
+    def report(self):
+        writes, skipped = self.monitor.write_counts()
+        elapsed = self.elapsed or float('nan')
+        return '{} records, {} frames in {:.3f} s: {:.0f} frames/s, {} writes ({:.0f}/s), {} skipped'.format(
+            len(self.records), self.frames, self.elapsed, self.frames / elapsed,
+            writes, writes / elapsed, skipped)
+
+
+def run(monitor, argv=None, live=None):
+    """
+    Run the monitor (or `live()`, e.g. Daemon(monitor).run), or replay a trace with --replay
+    """
+    parser = argparse.ArgumentParser(description='Using Audio VU Meters to Monitor System Activity')
+    parser.add_argument('--replay', metavar='FILE', help='play a history ring or CSV file instead')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay speed multiplier')
+    parser.add_argument('--fast', action='store_true', help='replay as fast as possible')
+    args = parser.parse_args(argv)
+    if args.replay is None:
+        return (live or monitor.run)()
+    fields, records = load(args.replay)
+    replay = Replay(monitor, fields, records, args.speed, args.fast)
+    try:
+        replay.play()
+    except KeyboardInterrupt:
+        pass
+    print(replay.report())
+
+
+__all__ = ['Replay', 'load', 'run']
@@ -0,0 +1,244 @@
+"""
+Samplers read the system statistics that the meters display.
+
+A sampler takes cheap snapshots of the raw counters and computes the rates
+from two consecutive snapshots, so it never has to sleep itself.
+The rates are a dict of metric name -> percent (0 ... 100), so every meter
+can pick the metric it wants from the same reading: the whole system, one
+core, one interface, see rates().
+
+- ProcSampler: reads /proc/stat and /proc/net/dev directly through file
+  handles that stay open, cheap enough to poll at 20 - 50 Hz
+- PsutilSampler: portable fallback with psutil
+
+net_max is the bandwidth in bytes per second that fills the network meters,
+or 'auto' (an AutoRange, see vumonitor.autorange) to follow the traffic.
+"""
+
+from __future__ import division
+
+import collections
+import os
+import time
+
+# PS UTIL for monitoring the system activity, only needed as a fallback
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from vumonitor.autorange import AutoRange, net_range
+from vumonitor.mapping import NET_MAX, clamp_percent
+
+Snapshot = collections.namedtuple(
+    'Snapshot', ['time', 'cpu_busy', 'cpu_total', 'bytes_recv', 'bytes_sent', 'cores', 'interfaces'])
+"""
+cores is a tuple of (busy, total) per core, interfaces a dict of name -> (bytes received, bytes sent)
+"""
+
+
+def busy_percent(busy, total):
+    if total <= 0:
+        return 0
+    return clamp_percent(busy / total * 100)
+
+
+def cpu_percent(before, after):
+    """
+    CPU usage between two snapshots, like psutil.cpu_percent(interval)
+    """
+    return busy_percent(after.cpu_busy - before.cpu_busy, after.cpu_total - before.cpu_total)
+
+
+def net_percent(before, after, net_max=NET_MAX):
+    """
+    Network traffic between two snapshots in relation to our maximum bandwidth (bytes per second),
+    the receiving traffic and sending traffic is just added together
+    """
+    elapsed = after.time - before.time
+    if elapsed <= 0:
+        return 0
+    net_current = ((after.bytes_recv - before.bytes_recv) +
+                   (after.bytes_sent - before.bytes_sent))
+    return clamp_percent((net_current / elapsed / net_max) * 100)
+
+
+def rates(before, after, net_max=NET_MAX):
+    """
+    Every metric that can be derived from two snapshots:
+
+    - cpu: all CPUs, cpu0, cpu1, ...: one core each,
+      cpu_max: the busiest core, cpu_mean: mean of the cores
+    - net: received + sent, net_rx / net_tx: received / sent,
+      net:eth0, rx:eth0, tx:eth0: the same per interface
+    """
+    metrics = {'cpu': cpu_percent(before, after),
+               'net': net_percent(before, after, net_max)}
+    cores = [busy_percent(a[0] - b[0], a[1] - b[1]) for b, a in zip(before.cores, after.cores)]
+    for i, value in enumerate(cores):
+        metrics['cpu{}'.format(i)] = value
+    if cores:
+        metrics['cpu_max'] = max(cores)
+        metrics['cpu_mean'] = sum(cores) / len(cores)
+    elapsed = after.time - before.time
+    if elapsed <= 0:
+        return metrics
+    scale = 100 / elapsed / net_max
+    metrics['net_rx'] = clamp_percent((after.bytes_recv - before.bytes_recv) * scale)
+    metrics['net_tx'] = clamp_percent((after.bytes_sent - before.bytes_sent) * scale)
+    for name, (recv, sent) in after.interfaces.items():
+        if name not in before.interfaces:
+            continue
+        recv -= before.interfaces[name][0]
+        sent -= before.interfaces[name][1]
+        metrics['net:' + name] = clamp_percent((recv + sent) * scale)
+        metrics['rx:' + name] = clamp_percent(recv * scale)
+        metrics['tx:' + name] = clamp_percent(sent * scale)
+    return metrics
+
+
+def current_net_max(net_max, before, after):
+    """
+    net_max for the rates between two snapshots, an AutoRange is updated with the traffic first
+    """
+    if not isinstance(net_max, AutoRange):
+        return net_max
+    elapsed = after.time - before.time
+    if elapsed > 0:
+        net_max.update(((after.bytes_recv - before.bytes_recv) +
+                        (after.bytes_sent - before.bytes_sent)) / elapsed, after.time)
+    return net_max.value
+
+
+class PsutilSampler(object):
+    """
+    Snapshots of the current network usage and CPU usage with psutil
+    """
+
+    def __init__(self, net_max=NET_MAX, clock=time.monotonic):
+        if psutil is None:
+            raise RuntimeError('psutil is not installed')
+        self.net_max = net_range(net_max)
+        self.clock = clock
+
+    def close(self):
+        pass
+
+    def snapshot(self):
+        cores = []
+        for cpu in psutil.cpu_times(percpu=True):
+            total = sum(cpu)
+            cores.append((total - cpu.idle - getattr(cpu, 'iowait', 0), total))
+        interfaces = dict((name, (net.bytes_recv, net.bytes_sent))
+                          for name, net in psutil.net_io_counters(pernic=True).items())
+        return Snapshot(self.clock(),
+                        sum(core[0] for core in cores), sum(core[1] for core in cores),
+                        sum(net[0] for net in interfaces.values()),
+                        sum(net[1] for net in interfaces.values()),
+                        tuple(cores), interfaces)
+
+    def rates(self, before, after):
+        return rates(before, after, current_net_max(self.net_max, before, after))
+
+
+class ProcSampler(object):
+    """
+    Snapshots straight from /proc/stat and /proc/net/dev (Linux only).
+
+    Both files are opened once and kept open. Every snapshot seeks back to the
+    start and reads into the same buffer, then only the aggregate cpu line and
+    the rx / tx byte columns are parsed.
+    `interfaces` limits the network traffic to some interfaces, None counts all
+    of them (like psutil.net_io_counters())
+    """
+
+    def __init__(self, net_max=NET_MAX, clock=time.monotonic, interfaces=None,
+                 proc='/proc', bufsize=16384):
+        self.net_max = net_range(net_max, interfaces)
+        self.clock = clock
+        self.interfaces = None if interfaces is None else set(i.encode() for i in interfaces)
+        self.stat = open(os.path.join(proc, 'stat'), 'rb', buffering=0)
+        self.netdev = open(os.path.join(proc, 'net', 'dev'), 'rb', buffering=0)
+        self.buf = bytearray(bufsize)
+
+    def close(self):
+        self.stat.close()
+        self.netdev.close()
+
+    def _read(self, f):
+        """ Reread a whole /proc file into the shared buffer, grow the buffer if it is too small """
+        while True:
+            f.seek(0)
+            n = f.readinto(self.buf)
+            if n < len(self.buf):
+                return n
+            self.buf = bytearray(len(self.buf) * 2)
+
+    def read_cpu(self):
+        """
+        (busy, total) jiffies of all CPUs and a tuple of (busy, total) per core,
+        from the cpu lines at the top: user nice system idle iowait irq softirq steal
+        """
+        n = self._read(self.stat)
+        buf = self.buf
+        aggregate = None
+        cores = []
+        start = 0
+        # stop at the first line after the cpu lines, the rest of the file is never parsed
+        while buf.startswith(b'cpu', start):
+            end = buf.find(b'\n', start, n)
+            times = [int(x) for x in buf[start:end].split()[1:9]]
+            start = end + 1
+            total = sum(times)
+            if aggregate is None:
+                aggregate = (total - times[3] - times[4], total)
+            else:
+                cores.append((total - times[3] - times[4], total))
+        return aggregate, tuple(cores)
+
+    def read_net(self):
+        """ {name: (bytes received, bytes sent)} of the interfaces """
+        n = self._read(self.netdev)
+        interfaces = {}
+        # two header lines, then "  name: rx_bytes packets errs drop fifo frame compressed multicast tx_bytes ..."
+        for line in self.buf[:n].splitlines()[2:]:
+            name, _, counters = line.partition(b':')
+            name = name.strip()
+            if self.interfaces is not None and name not in self.interfaces:
+                continue
+            fields = counters.split()
+            interfaces[name.decode()] = (int(fields[0]), int(fields[8]))
+        return interfaces
+
+    def read_net_total(self):
+        """ bytes received + sent of the interfaces as one int, without building a dict """
+        n = self._read(self.netdev)
+        total = 0
+        for line in self.buf[:n].splitlines()[2:]:
+            name, _, counters = line.partition(b':')
+            if self.interfaces is not None and name.strip() not in self.interfaces:
+                continue
+            fields = counters.split()
+            total += int(fields[0]) + int(fields[8])
+        return total
+
+    def snapshot(self):
+        (busy, total), cores = self.read_cpu()
+        interfaces = self.read_net()
+        return Snapshot(self.clock(), busy, total,
+                        sum(net[0] for net in interfaces.values()),
+                        sum(net[1] for net in interfaces.values()),
+                        cores, interfaces)
+
+    def rates(self, before, after):
+        return rates(before, after, current_net_max(self.net_max, before, after))
+
+
+def default_sampler(net_max=NET_MAX, clock=time.monotonic):
+    """
+    ProcSampler where /proc is available, PsutilSampler everywhere else
+    """
+    try:
+        return ProcSampler(net_max, clock)
+    except (IOError, OSError):
+        return PsutilSampler(net_max, clock)
@@ -0,0 +1,143 @@
+"""
+Deadline scheduler for the main loop
+
+Instead of sleeping a fixed amount after each cycle (which adds up the time
+spent sampling and writing, so the period drifts), every cycle is scheduled
+at an absolute deadline t0 + n * period on the monotonic clock.
+
+The AdaptiveScheduler lowers the rate while the metrics are stable and the
+needles are at rest, so an idle monitor hardly wakes up at all.
+"""
+
+from __future__ import division
+
+import time
+
+USAGE_WINDOW = 10.0  # seconds, usage() reports the rates of the last complete window
+
+
+def sleep_until(deadline, clock=time.monotonic, spin=0.0):
+    """
+    Sleep until shortly (spin seconds) before deadline, then spin the rest.
+    Returns the time it woke up
+    """
+    delay = deadline - clock() - spin
+    if delay > 0:
+        time.sleep(delay)
+    now = clock()
+    while now < deadline:
+        now = clock()
+    return now
+
+
+def usage_rates(before, after):
+    """ Wakeups and CPU seconds per second between two (time, ticks, CPU time) """
+    elapsed = after[0] - before[0]
+    if elapsed <= 0:
+        return 0.0, 0.0
+    return (after[1] - before[1]) / elapsed, (after[2] - before[2]) / elapsed
+
+
+class DeadlineScheduler(object):
+    """
+    Fires at fixed deadlines on the monotonic clock.
+
+    wait() sleeps until the next deadline and returns how late it woke up
+    (drift, in seconds). If a cycle overran so badly that whole periods
+    passed, those deadlines are skipped and counted in `missed`, the
+    cadence stays on the original grid.
+    """
+
+    def __init__(self, period, clock=time.monotonic, sleep=time.sleep):
+        self.period = period
+        self.clock = clock
+        self.sleep = sleep
+        self.deadline = None
+        self.ticks = 0
+        self.missed = 0
+        self.drift = 0.0
+        self.max_drift = 0.0
+        self.window = None
+        self.last_usage = None
+
+    def start(self):
+        now = self.clock()
+        self.window = (now, self.ticks, time.process_time())
+        self.deadline = now + self.period
+        return self.deadline
+
+    def usage(self):
+        """
+        (wakeups per second, CPU seconds of this process per second) over the last
+        complete USAGE_WINDOW, or since start() within the first one. Reading it
+        changes nothing, wait() moves the window on.
+        """
+        if self.last_usage is not None:
+            return self.last_usage
+        if self.window is None:
+            return 0.0, 0.0
+        return usage_rates(self.window, (self.clock(), self.ticks, time.process_time()))
+
+    def wait(self):
+        if self.deadline is None:
+            self.start()
+        delay = self.deadline - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+        now = self.clock()
+        self.drift = now - self.deadline
+        if self.drift > self.max_drift:
+            self.max_drift = self.drift
+        self.ticks += 1
+        if now - self.window[0] >= USAGE_WINDOW:
+            window = (now, self.ticks, time.process_time())
+            self.last_usage = usage_rates(self.window, window)
+            self.window = window
+        self.deadline += self.period
+        if now >= self.deadline:
+            skipped = int((now - self.deadline) // self.period) + 1
+            self.missed += skipped
+            self.deadline += skipped * self.period
+        return self.drift
+
+
+class AdaptiveScheduler(DeadlineScheduler):
+    """
+    DeadlineScheduler that backs off while nothing happens.
+
+    After every frame the Monitor calls observe() with the largest change of a
+    metric (percent, 0 in frames without a sample) and the largest distance a slew
+    or the ballistics still have to move a needle (percent of full scale). Writes
+    caused by the sample itself are not motion, the change alone judges them.
+    Once both stayed below `threshold` percent for `settle` seconds, the period
+    doubles with every quiet frame up to `idle_period`. A change or distance of
+    `threshold` or more goes back to the full rate at once.
+    """
+
+    def __init__(self, period, idle_period=1.0, settle=2.0, threshold=1.0,
+                 clock=time.monotonic, sleep=time.sleep):
+        DeadlineScheduler.__init__(self, period, clock, sleep)
+        self.fast_period = period
+        self.idle_period = max(period, idle_period)
+        self.settle = settle
+        self.threshold = threshold
+        self.quiet_since = None
+
+    @property
+    def idle(self):
+        return self.period > self.fast_period
+
+    def observe(self, change, distance):
+        now = self.clock()
+        if change >= self.threshold or distance >= self.threshold:
+            self.quiet_since = None
+            if self.idle:
+                self.period = self.fast_period
+                self.deadline = now + self.period
+            return
+        if self.quiet_since is None:
+            self.quiet_since = now
+        elif now - self.quiet_since >= self.settle and self.period < self.idle_period:
+            period = min(self.period * 2, self.idle_period)
+            self.deadline += period - self.period
+            self.period = period
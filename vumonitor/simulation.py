@@ -0,0 +1,140 @@
+"""
+Simulation on a virtual clock
+
+Runs the whole pipeline (sampler, meters, curves, ballistics, slews, write
+caches, scheduler) on a deterministic clock that jumps to the next deadline
+instead of sleeping, so days of monitor time take seconds. The system is a
+load function of time, the outputs are recorded into arrays:
+
+    sim = Simulation(lambda t: (50, 1e6, 0), polling_max=5)
+    sim.monitor.add_meter(Meter('cpu', sim.backend, 0, GrowthCurve(700, 600, integer=True)))
+    sim.run(3 * 24 * 3600)
+    times, values = sim.backend.trace(0)
+
+`wrap` makes the byte counters overflow like 32 bit counters do.
+"""
+
+from __future__ import division
+
+import array
+
+from vumonitor.autorange import net_range
+from vumonitor.backends.base import Backend
+from vumonitor.monitor import Monitor
+from vumonitor.sampler import Snapshot, current_net_max, rates
+from vumonitor.scheduler import DeadlineScheduler
+
+USER_HZ = 100  # jiffies per second in /proc/stat
+
+
+class VirtualClock(object):
+    """
+    Clock that only moves when something sleeps, use it as clock and sleep
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+
+class SimulatedSampler(object):
+    """
+    Sampler of a simulated system, with the counters of /proc.
+
+    load(t) returns (cpu percent, bytes received per second, bytes sent per second)
+    at time t. Between two snapshots the load of the later one is integrated into the
+    jiffies of `cores` cores and the byte counters of one interface, 'sim0'.
+    """
+
+    def __init__(self, load, clock, net_max=15000000, cores=4, wrap=None):
+        self.load = load
+        self.clock = clock
+        self.net_max = net_range(net_max)
+        self.cores = cores
+        self.wrap = wrap
+        self.time = clock()
+        self.busy = 0.0
+        self.total = 0.0
+        self.recv = 0.0
+        self.sent = 0.0
+
+    def close(self):
+        pass
+
+    def snapshot(self):
+        now = self.clock()
+        elapsed = now - self.time
+        if elapsed > 0:
+            cpu, recv, sent = self.load(now)
+            jiffies = elapsed * USER_HZ
+            self.busy += cpu / 100 * jiffies
+            self.total += jiffies
+            self.recv += recv * elapsed
+            self.sent += sent * elapsed
+            self.time = now
+        recv, sent = int(self.recv), int(self.sent)
+        if self.wrap:
+            recv %= self.wrap
+            sent %= self.wrap
+        busy, total = int(self.busy), int(self.total)
+        return Snapshot(now, busy * self.cores, total * self.cores, recv, sent,
+                        ((busy, total),) * self.cores, {'sim0': (recv, sent)})
+
+    def rates(self, before, after):
+        return rates(before, after, current_net_max(self.net_max, before, after))
+
+
+class RecordingBackend(Backend):
+    """
+    Records every write as (time, channel, value) into three arrays
+    """
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.times = array.array('d')
+        self.channels = array.array('l')
+        self.values = array.array('d')
+
+    def write(self, channel, value):
+        self.times.append(self.clock())
+        self.channels.append(channel)
+        self.values.append(value)
+
+    def trace(self, channel):
+        """ (times, values) of the writes to one channel """
+        times = array.array('d')
+        values = array.array('d')
+        for t, c, v in zip(self.times, self.channels, self.values):
+            if c == channel:
+                times.append(t)
+                values.append(v)
+        return times, values
+
+
+class Simulation(object):
+    """
+    A Monitor on a VirtualClock with a SimulatedSampler and a RecordingBackend.
+    Add meters to `monitor` (on `backend`, or any backend on fake hardware), then run().
+    """
+
+    def __init__(self, load, polling_max=1, frame_rate=None, net_max=15000000, cores=4,
+                 wrap=None, start=0.0, **kwargs):
+        self.clock = VirtualClock(start)
+        self.sampler = SimulatedSampler(load, self.clock, net_max, cores, wrap)
+        period = 1 / frame_rate if frame_rate else polling_max
+        scheduler = DeadlineScheduler(period, self.clock, self.clock.sleep)
+        self.monitor = Monitor(self.sampler, polling_max, scheduler, frame_rate, **kwargs)
+        self.backend = RecordingBackend(self.clock)
+
+    def run(self, seconds):
+        """ Run the monitor for `seconds` of virtual time """
+        self.monitor.run(until=self.clock() + seconds)
+
+
+__all__ = ['RecordingBackend', 'SimulatedSampler', 'Simulation', 'VirtualClock']
@@ -0,0 +1,47 @@
+"""
+Needle slew between samples
+
+The system is only sampled once per polling cycle, so without help the needles
+jump from one value to the next. A Slew runs at the output frame rate (e.g. 60 Hz)
+and moves the value toward the newest target with a limited speed, which gives
+smooth needle movement without sampling /proc at 60 Hz.
+"""
+
+from __future__ import division
+
+
+class Slew(object):
+    """
+    Moves the output value of one meter toward its target.
+
+    rise and fall are the maximum speed in output values per second (duty cycle
+    or DAC value), fall defaults to rise. The value is quantized to `resolution`
+    (1 for DACs and wiringpi, e.g. 0.1 for software PWM duty cycles) and step()
+    only returns a value when the quantized value changed, otherwise None.
+    Every meter needs its own Slew.
+    """
+
+    def __init__(self, rise, fall=None, resolution=1):
+        self.rise = rise
+        self.fall = rise if fall is None else fall
+        self.resolution = resolution
+        self.value = 0.0  # all backends start at zero
+        self.target = 0.0
+        self.written = self.quantize(0)
+
+    def quantize(self, value):
+        if self.resolution == 1:
+            return int(value)
+        return int(value / self.resolution) * self.resolution
+
+    def step(self, dt):
+        diff = self.target - self.value
+        if diff > 0:
+            self.value = min(self.target, self.value + self.rise * dt)
+        elif diff < 0:
+            self.value = max(self.target, self.value - self.fall * dt)
+        code = self.quantize(self.value)
+        if code == self.written:
+            return None
+        self.written = code
+        return code
@@ -0,0 +1,166 @@
+"""
+Timing instrumentation for the main loop
+
+Records the actual loop period, the time spent sampling, mapping and writing,
+and how late the loop woke up, into fixed size histograms (8 buckets per power
+of two microseconds, so recording is a bit_length(), a shift and an increment).
+Missed deadlines come from the DeadlineScheduler.
+
+The report can be dumped to stderr on SIGUSR1:
+
+    kill -USR1 <pid>
+
+or read over a local unix socket:
+
+    socat - UNIX-CONNECT:/run/vumonitor.sock
+
+Without stats the Monitor only pays one `is None` check per frame.
+"""
+
+from __future__ import division
+
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+SUB = 8  # buckets per power of two, the error of a bucket is at most 1/8
+BUCKETS = SUB + 28 * SUB  # up to 2**31 us, about 35 minutes
+
+
+def bucket(us):
+    """ Bucket of a duration in whole microseconds """
+    if us < SUB:
+        return us
+    e = us.bit_length() - 4
+    i = SUB + e * SUB + ((us >> e) & 7)
+    return i if i < BUCKETS else BUCKETS - 1
+
+
+def upper_bound(i):
+    """ First duration (us) after bucket i """
+    if i < SUB:
+        return i + 1
+    e, m = divmod(i - SUB, SUB)
+    return (SUB + m + 1) << e
+
+
+class Histogram(object):
+    """
+    Durations in log-linear buckets of microseconds
+    """
+
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.buckets[bucket(int(seconds * 1e6))] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """ Upper bound of the bucket that holds the p-th percentile, in seconds """
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(upper_bound(i) / 1e6, self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class Stats(object):
+    """
+    Histograms of the loop: period, late (wake up after the deadline), sample, map, write
+    """
+
+    names = ('period', 'late', 'sample', 'map', 'write')
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.histograms = dict((name, Histogram()) for name in self.names)
+        self.scheduler = None
+        self.last = None
+        self.server = None
+
+    def record(self, name, seconds):
+        self.histograms[name].record(seconds)
+
+    def loop(self, now, late):
+        """ Called once per frame right after waking up """
+        if self.last is not None:
+            self.histograms['period'].record(now - self.last)
+        self.last = now
+        self.histograms['late'].record(late)
+
+    def report(self):
+        lines = []
+        if self.scheduler is not None:
+            lines.append('frames: {}  missed deadlines: {}  max late: {:.3f} ms'.format(
+                self.scheduler.ticks, self.scheduler.missed, self.scheduler.max_drift * 1e3))
+            wakeups, cpu = self.scheduler.usage()
+            lines.append('period: {:.1f} ms  wakeups/s: {:.1f}  cpu: {:.2f} %'.format(
+                self.scheduler.period * 1e3, wakeups, cpu * 100))
+        lines.append('{:<8}{:>10}{:>10}{:>10}{:>10}{:>10}  (ms)'.format(
+            '', 'count', 'mean', 'p50', 'p99', 'max'))
+        for name in self.names:
+            h = self.histograms[name]
+            lines.append('{:<8}{:>10}{:>10.3f}{:>10.3f}{:>10.3f}{:>10.3f}'.format(
+                name, h.count, h.mean * 1e3, h.percentile(50) * 1e3,
+                h.percentile(99) * 1e3, h.max * 1e3))
+        return '\n'.join(lines) + '\n'
+
+    def install_signal(self, signum=signal.SIGUSR1, stream=None):
+        """ Dump the report to stream (stderr) whenever the process gets signum """
+        def dump(signum, frame):
+            out = stream or sys.stderr
+            out.write(self.report())
+            out.flush()
+        signal.signal(signum, dump)
+
+    def serve(self, path):
+        """ Send the report to every client that connects to the unix socket at path """
+        if os.path.exists(path):
+            os.unlink(path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(path)
+        self.server.listen(4)
+        thread = threading.Thread(target=self._serve, name='vumonitor-stats')
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _serve(self):
+        server = self.server
+        while True:
+            try:
+                client, _ = server.accept()
+            except OSError:
+                return  # closed
+            try:
+                client.sendall(self.report().encode())
+            except OSError:
+                pass
+            finally:
+                client.close()
+
+    def close(self):
+        if self.server is not None:
+            path = self.server.getsockname()
+            self.server.close()
+            self.server = None
+            if path and os.path.exists(path):
+                os.unlink(path)
@@ -0,0 +1,209 @@
+"""
+Waveform playback for calibration sweeps
+
+The calibration tools used to set a value, print it and sleep 0.1 s, so the step
+timing drifted with the terminal and the Python overhead. Here the whole sweep is
+computed up front as an array of output values (ramp, triangle, steps, chirp) and
+played against absolute deadlines, on any backend. Printing happens in a separate
+thread that catches up with the player, never in the timing path.
+
+That makes sweeps reproducible and fast enough (kHz) to characterize how quickly
+a meter responds.
+
+    python -m vumonitor.waveform mcp4922 --channels 0 1 --shape triangle --low 0 --high 600 \
+        --count 101 --rate 1000 --repeat 10
+"""
+
+from __future__ import division
+
+import argparse
+import array
+import math
+import sys
+import threading
+import time
+
+from vumonitor.scheduler import sleep_until
+
+
+def _codes(values, integer):
+    if integer:
+        return array.array('l', (int(round(v)) for v in values))
+    return array.array('d', values)
+
+
+def ramp(start, stop, count, integer=True):
+    """ count values from start to stop (both included) """
+    if count == 1:
+        return _codes([start], integer)
+    return _codes((start + (stop - start) * i / (count - 1) for i in range(count)), integer)
+
+
+def triangle(low, high, count, integer=True):
+    """ Up from low to high in count values and back down, without repeating the ends """
+    up = ramp(low, high, count, integer)
+    return up + array.array(up.typecode, reversed(up[1:-1]))
+
+
+def steps(levels, hold, integer=True):
+    """ Every level held for `hold` values """
+    return _codes((level for level in levels for _ in range(hold)), integer)
+
+
+def chirp(low, high, f0, f1, duration, rate, integer=True):
+    """ Sine between low and high, frequency sweeping linearly from f0 to f1 Hz """
+    count = int(round(duration * rate))
+    middle = (low + high) / 2
+    amplitude = (high - low) / 2
+    slope = (f1 - f0) / duration
+    return _codes((middle - amplitude * math.cos(2 * math.pi * (f0 * t + slope / 2 * t * t))
+                   for t in (i / rate for i in range(count))), integer)
+
+
+def mapped(curve, values):
+    """ Values (e.g. percent) through a curve, e.g. a GrowthCurve """
+    return _codes((curve(v) for v in values), getattr(curve, 'integer', False))
+
+
+class Player(object):
+    """
+    Plays arrays of output values on channels of a backend at a fixed rate.
+
+    Every value has an absolute deadline start + i / rate. The player sleeps until
+    shortly (spin) before it and spins the rest. How late every value went out is
+    kept in `late` (seconds). With a `log` stream, a printer thread writes one line
+    per value, catching up every log_interval seconds.
+    """
+
+    def __init__(self, backend, channels, rate, clock=time.monotonic, spin=0.0005,
+                 log=None, log_interval=0.1):
+        self.backend = backend
+        self.channels = list(channels)
+        self.rate = rate
+        self.clock = clock
+        self.spin = spin
+        self.log = log
+        self.log_interval = log_interval
+        self.codes = None
+        self.late = None
+        self.position = 0  # values played so far
+
+    def _printer(self, done):
+        logged = 0
+        while True:
+            finished = done.wait(self.log_interval)
+            position = self.position
+            if position > logged:
+                count = len(self.codes)
+                self.log.write(''.join('i = {}, value = {}\n'.format(i % count, self.codes[i % count])
+                                       for i in range(logged, position)))
+                self.log.flush()
+                logged = position
+            if finished and logged >= self.position:
+                return
+
+    def play(self, codes, repeat=1):
+        """
+        Play codes `repeat` times (None: until interrupted), the deadlines stay on one grid
+        """
+        self.codes = codes
+        self.late = array.array('d', [0.0]) * len(codes)
+        period = 1 / self.rate
+        write = self.backend.write
+        flush = self.backend.flush
+        channels = self.channels
+        clock = self.clock
+        done = threading.Event()
+        printer = None
+        if self.log is not None:
+            printer = threading.Thread(target=self._printer, args=(done,), name='vumonitor-log')
+            printer.daemon = True
+            printer.start()
+        start = clock() + period
+        n = self.position = 0
+        try:
+            while repeat is None or n < repeat * len(codes):
+                i = n % len(codes)
+                deadline = start + n * period
+                now = sleep_until(deadline, clock, self.spin)
+                code = codes[i]
+                for channel in channels:
+                    write(channel, code)
+                flush()
+                self.late[i] = now - deadline
+                n += 1
+                self.position = n
+        finally:
+            done.set()
+            if printer is not None:
+                printer.join()
+        return self.late
+
+
+def report(late):
+    """ One line summary of how late the values went out """
+    ordered = sorted(late)
+    if not ordered:
+        return 'nothing played'
+    return 'late: p50 {:.1f} us, p99 {:.1f} us, max {:.1f} us'.format(
+        ordered[len(ordered) // 2] * 1e6, ordered[int(len(ordered) * 0.99)] * 1e6, ordered[-1] * 1e6)
+
+
+__all__ = ['Player', 'chirp', 'mapped', 'ramp', 'report', 'steps', 'triangle']
+
+
+def main(argv=None):
+    from vumonitor.calibration import make_backend
+
+    parser = argparse.ArgumentParser(description='Play a sweep on a VU Meter')
+    parser.add_argument('backend', choices=['rpigpio', 'wiringpi', 'mcp4922', 'spidev-mcp4922',
+                                            'mcp4725', 'i2cdev-mcp4725'])
+    parser.add_argument('--channels', type=int, nargs='+', default=[0], help='pins or DAC channels')
+    parser.add_argument('--address', type=lambda x: int(x, 0), default=0x62, help='I2C address')
+    parser.add_argument('--shape', choices=['ramp', 'triangle', 'steps', 'chirp'], default='triangle')
+    parser.add_argument('--low', type=float, default=0)
+    parser.add_argument('--high', type=float, default=600)
+    parser.add_argument('--count', type=int, default=101, help='values per ramp, levels for steps')
+    parser.add_argument('--hold', type=int, default=100, help='values per level (steps)')
+    parser.add_argument('--f0', type=float, default=0.5, help='start frequency (chirp, Hz)')
+    parser.add_argument('--f1', type=float, default=10, help='end frequency (chirp, Hz)')
+    parser.add_argument('--duration', type=float, default=10, help='seconds (chirp)')
+    parser.add_argument('--rate', type=float, default=10, help='values per second')
+    parser.add_argument('--repeat', type=int, default=None, help='default: until CTRL + C')
+    parser.add_argument('--float', action='store_true', help='float values (RPi.GPIO duty cycles)')
+    parser.add_argument('--quiet', action='store_true', help='do not print every value')
+    args = parser.parse_args(argv)
+
+    integer = not args.float
+    if args.shape == 'ramp':
+        codes = ramp(args.low, args.high, args.count, integer)
+    elif args.shape == 'triangle':
+        codes = triangle(args.low, args.high, args.count, integer)
+    elif args.shape == 'steps':
+        codes = steps(ramp(args.low, args.high, args.count, False), args.hold, integer)
+    else:
+        codes = chirp(args.low, args.high, args.f0, args.f1, args.duration, args.rate, integer)
+
+    if args.backend in ('rpigpio', 'wiringpi'):
+        from vumonitor import backends
+        if args.backend == 'rpigpio':
+            backend = backends.RPiGPIOPWM(args.channels)
+        else:
+            backend = backends.WiringPiPWM(args.channels)
+    else:
+        backend = make_backend(args.backend, args.address)(args.channels[0])
+    player = Player(backend, args.channels, args.rate, log=None if args.quiet else sys.stdout)
+    print('Press CTRL + C to exit')
+    backend.start()
+    try:
+        player.play(codes, args.repeat)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend.stop()
+    print(report(player.late))
+
+
+if __name__ == '__main__':
+    main()
+